@@ -0,0 +1,297 @@
+import sys
+import csv
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from cex_bivar import Bivar
+from cex_logging import Async_Logger
+
+
+class Sim_Response(object):
+
+    def __init__(self, data, status_code=200) -> None:
+        self.data = data
+        self.status_code = status_code
+        self.headers = dict()
+
+    def json(self):
+        return self.data
+
+
+class Sim_Exchange(object):
+    """
+    Matching exchange for one pair against USDT, answering the same paths and response shapes as HBTC.
+    Passive orders fill when the market trades through their price, crossing orders fill at once.
+    """
+    concurrent = False
+    # no retries or request signing against it, see AMM_Model
+    simulated = True
+
+    def __init__(self, symbol_name, balances, tick_size='0.0001', step_size='0.01', fee_rate=0.0) -> None:
+        super().__init__()
+
+        self.symbol_name = symbol_name.upper()
+        self.symbol = f'{self.symbol_name}USDT'
+        self.tick_size, self.step_size = tick_size, step_size
+        self.fee_rate = fee_rate
+
+        # asset -> [free, locked]
+        self.balances = {asset.upper(): [float(value), 0.0] for asset, value in balances.items()}
+        self.balances.setdefault(self.symbol_name, [0.0, 0.0])
+        self.balances.setdefault('USDT', [0.0, 0.0])
+
+        self.time = 0.0
+        self.bid, self.ask, self.bid_qty, self.ask_qty = 0.0, 0.0, 0.0, 0.0
+        self.orders = dict()  # orderId -> public order dict
+        self.books = dict()  # orderId -> (side, price, quantity, locked)
+        self.next_order_id = 1
+
+        self.calls = Counter()
+        self.fills = list()  # (time, side, price, quantity)
+        self.routes = {
+            ('GET', 'v1/account'): self._account,
+            ('GET', 'v1/brokerInfo'): self._broker_info,
+            ('GET', 'quote/v1/ticker/bookTicker'): self._book_ticker,
+            ('GET', 'quote/v1/depth'): self._depth,
+            ('GET', 'quote/v1/ticker/price'): self._price,
+            ('GET', 'v1/openOrders'): self._open_orders,
+            ('GET', 'v1/historyOrders'): lambda params: list(),
+            ('GET', 'v1/withdrawalOrders'): lambda params: list(),
+            ('POST', 'v1/order'): self._new_order,
+            ('DELETE', 'v1/order'): self._cancel_order,
+        }
+
+    # -------------------- transport interface --------------------
+    def clock(self):
+        return self.time
+
+    def sleep(self, seconds):
+        self.time += seconds
+
+    def request(self, method, url, headers={}, params={}):
+        path = url.split('/openapi/')[-1]
+        self.calls[f'{method} {path}'] += 1
+        return Sim_Response(self.routes[(method, path)](params))
+
+    @property
+    def stats(self):
+        return {'opened': 0, 'reused': sum(self.calls.values())}
+
+    def close(self):
+        pass
+
+    # -------------------- market --------------------
+    def on_tick(self, timestamp, bid, ask, bid_qty=1.0, ask_qty=1.0):
+        self.time = timestamp
+        self.bid, self.ask, self.bid_qty, self.ask_qty = bid, ask, bid_qty, ask_qty
+        for order_id, (side, price, _, _) in list(self.books.items()):
+            if (side == 'BUY' and price >= ask) or (side == 'SELL' and price <= bid):
+                self._fill(order_id, price)
+
+    @property
+    def mid(self):
+        return (self.bid + self.ask) * 0.5
+
+    def _fill(self, order_id, price):
+        del self.orders[order_id]
+        side, _, quantity, locked = self.books.pop(order_id)
+        token, usdt = self.balances[self.symbol_name], self.balances['USDT']
+        if side == 'BUY':
+            usdt[1] -= locked
+            usdt[0] += locked - price * quantity
+            token[0] += quantity * (1 - self.fee_rate)
+        else:
+            token[1] -= locked
+            usdt[0] += price * quantity * (1 - self.fee_rate)
+        self.fills.append((self.time, side, price, quantity))
+
+    # -------------------- endpoints --------------------
+    def _account(self, params):
+        return {'balances': [{'asset': asset, 'assetId': asset, 'assetName': asset,
+                              'total': str(free + locked), 'free': str(free), 'locked': str(locked)}
+                             for asset, (free, locked) in self.balances.items()]}
+
+    def _broker_info(self, params):
+        filters = [{'minPrice': self.tick_size, 'maxPrice': '100000', 'tickSize': self.tick_size},
+                   {'minQty': self.step_size, 'maxQty': '10000000', 'stepSize': self.step_size}]
+        return {'symbols': [{'symbol': self.symbol_name, 'filters': filters},
+                            {'symbol': self.symbol, 'filters': filters}]}
+
+    def _book_ticker(self, params):
+        return {'symbol': self.symbol, 'bidPrice': str(self.bid), 'bidQty': str(self.bid_qty),
+                'askPrice': str(self.ask), 'askQty': str(self.ask_qty)}
+
+    def _depth(self, params):
+        return {'time': int(self.time * 1000),
+                'bids': [[str(self.bid), str(self.bid_qty)]], 'asks': [[str(self.ask), str(self.ask_qty)]]}
+
+    def _price(self, params):
+        if params.get('symbol') != self.symbol:
+            return {'code': -1121, 'msg': 'Invalid symbol.'}
+        return {'symbol': self.symbol, 'price': str(self.mid)}
+
+    def _open_orders(self, params):
+        return list(self.orders.values())
+
+    def _new_order(self, params):
+        side, price, quantity = params['side'], float(params['price']), float(params['quantity'])
+        asset, locked = (('USDT', price * quantity) if side == 'BUY' else (self.symbol_name, quantity))
+        balance = self.balances[asset]
+        if quantity <= 0 or price <= 0 or balance[0] < locked:
+            return {'code': -1131, 'msg': 'Balance insufficient.'}
+        balance[0] -= locked
+        balance[1] += locked
+
+        order_id = str(self.next_order_id)
+        order = {'orderId': order_id, 'symbol': self.symbol, 'price': str(price),
+                 'origQty': str(quantity), 'executedQty': '0', 'status': 'NEW', 'side': side,
+                 'type': 'LIMIT', 'timeInForce': 'GTC', 'transactTime': str(int(self.time * 1000))}
+        self.next_order_id += 1
+        self.orders[order_id] = order
+        self.books[order_id] = (side, price, quantity, locked)
+        # crossing orders take liquidity at the touch
+        if side == 'BUY' and price >= self.ask:
+            self._fill(order_id, self.ask)
+            return dict(order, status='FILLED', executedQty=str(quantity))
+        if side == 'SELL' and price <= self.bid:
+            self._fill(order_id, self.bid)
+            return dict(order, status='FILLED', executedQty=str(quantity))
+        return dict(order)
+
+    def _cancel_order(self, params):
+        order = self.orders.pop(params['orderId'], None)
+        if order is None:
+            return {'code': -2013, 'msg': 'Order does not exist.'}
+        side, _, _, locked = self.books.pop(params['orderId'])
+        asset = 'USDT' if side == 'BUY' else self.symbol_name
+        self.balances[asset][0] += locked
+        self.balances[asset][1] -= locked
+        return dict(order, status='CANCELED')
+
+    def equity(self, price=None):
+        price = self.mid if price is None else price
+        token, usdt = self.balances[self.symbol_name], self.balances['USDT']
+        return sum(token) * price + sum(usdt)
+
+
+def load_ticks(path):
+    """
+    CSV rows of time (seconds), bid, ask[, bid_qty, ask_qty]
+    """
+    with open(path, 'r') as f:
+        for row in csv.reader(f):
+            if row and not row[0].startswith('#'):
+                try:
+                    yield tuple(float(value) for value in row)
+                except ValueError:
+                    continue
+
+
+class Backtest(object):
+
+    def __init__(self, ticks, shares, balances,
+                 symbol_name='GRIN',
+                 balance_ratio_condition=0.20,
+                 second_total_orders_threshold=100,
+                 second_restart_time=None,
+                 step_interval=1.0,
+                 tick_size='0.0001', step_size='0.01', fee_rate=0.0,
+                 **bivar_kwargs) -> None:
+        super().__init__()
+
+        self.ticks = ticks
+        self.shares = shares
+        self.symbol_name = symbol_name
+        self.balance_ratio_condition = balance_ratio_condition
+        self.second_total_orders_threshold = second_total_orders_threshold
+        self.second_restart_time = second_restart_time  # 'HH:MM:SS' in virtual local time, once a day
+        self.next_restart = None
+        # virtual seconds between strategy steps, ticks in between only hit the matching engine
+        self.step_interval = step_interval
+        self.bivar_kwargs = bivar_kwargs
+        self.exchange = Sim_Exchange(symbol_name, balances, tick_size=tick_size, step_size=step_size,
+                                     fee_rate=fee_rate)
+
+    def _restart_due(self):
+        # the daily restart fires once when the virtual clock passes it, like Event_Scheduler.daily
+        if self.second_restart_time is None:
+            return False
+        now = datetime.fromtimestamp(self.exchange.time)
+        if self.next_restart is None:
+            at = datetime.strptime(self.second_restart_time, '%H:%M:%S').time()
+            self.next_restart = datetime.combine(now.date(), at)
+            if self.next_restart <= now:
+                self.next_restart += timedelta(days=1)
+        if now < self.next_restart:
+            return False
+        while self.next_restart <= now:
+            self.next_restart += timedelta(days=1)
+        return True
+
+    def run(self):
+        ticks = iter(self.ticks)
+        self.exchange.on_tick(*next(ticks))
+        start_price, start_holdings = self.exchange.mid, {k: sum(v) for k, v in self.exchange.balances.items()}
+        start_equity = self.exchange.equity()
+
+        wall = time.time()
+        drifts, count, steps = list(), 0, 0
+        # strategy logs are noise at backtest speed, only errors are kept
+        logger = self.bivar_kwargs.pop('logger', None) or Async_Logger(level='ERROR')
+        bivar = Bivar(api_key='backtest', secret_key='backtest', shares=dict(self.shares),
+                      symbol_name=self.symbol_name, transport=self.exchange, logger=logger,
+                      **self.bivar_kwargs)
+        orders = bivar.refresh_tick()
+        if abs(bivar.ratio_ab - bivar.ratio) < self.balance_ratio_condition:
+            bivar.delete_orders(orders)
+
+        restart = self._restart_due()
+        bivar.main_step(orders, self.balance_ratio_condition, self.second_total_orders_threshold, restart)
+        next_step = self.exchange.time + self.step_interval
+        for tick in ticks:
+            self.exchange.on_tick(*tick)
+            count += 1
+            if self.exchange.time < next_step:
+                continue
+            orders = bivar.refresh_tick()
+            drifts.append(abs(bivar.ratio - bivar.ratio_ab))
+            restart = self._restart_due()
+            bivar.main_step(orders, self.balance_ratio_condition, self.second_total_orders_threshold, restart)
+            next_step = self.exchange.time + self.step_interval
+            steps += 1
+        wall = time.time() - wall
+
+        end_price = self.exchange.mid
+        hold_equity = start_holdings[self.exchange.symbol_name] * end_price + start_holdings['USDT']
+        end_equity = self.exchange.equity()
+        buys = [fill for fill in self.exchange.fills if fill[1] == 'BUY']
+        return {
+            'ticks': count,
+            'steps': steps,
+            'seconds': wall,
+            'ticks_per_second': count / wall if wall > 0 else float('inf'),
+            'start_price': start_price,
+            'end_price': end_price,
+            'start_equity': start_equity,
+            'end_equity': end_equity,
+            'pnl': end_equity - start_equity,
+            'pnl_vs_hold': end_equity - hold_equity,
+            'fills': len(self.exchange.fills),
+            'buy_fills': len(buys),
+            'sell_fills': len(self.exchange.fills) - len(buys),
+            'volume_usdt': sum([price * quantity for _, _, price, quantity in self.exchange.fills]),
+            'ratio_drift_mean': sum(drifts) / len(drifts) if drifts else 0.0,
+            'ratio_drift_max': max(drifts) if drifts else 0.0,
+            'api_calls': dict(self.exchange.calls),
+        }
+
+
+if __name__ == '__main__':
+    # python cex_backtest.py ticks.csv
+    report = Backtest(load_ticks(sys.argv[1]),
+                      shares={'GRIN': 7, 'USDT': 3},
+                      balances={'GRIN': 10000, 'USDT': 1000},
+                      first_step=0.005, second_step=0.01, second_order_depth=5).run()
+    for key, value in report.items():
+        print(f'{key}: {value}')
@@ -0,0 +1,179 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from cex_model import AMM_Model
+from cex_ratelimit import Request_Scheduler
+from cex_scheduler import Event_Scheduler
+
+
+class Basket(AMM_Model):
+
+    def __init__(self, api_key, secret_key,
+                 shares,
+                 first_step=0.01,
+                 rebalance_condition=0.02,
+                 pool_size=10,
+                 order_concurrency=4,
+                 broker_snapshot=None,
+                 transport=None,
+                 broker=None,
+                 limiter=None,
+                 logger=None,
+                 ) -> None:
+        super().__init__(api_key, secret_key, pool_size=pool_size, order_concurrency=order_concurrency,
+                         broker_snapshot=broker_snapshot, transport=transport, broker=broker, limiter=limiter,
+                         logger=logger)
+
+        # shares: {asset: weight, ..., 'USDT': weight}, every asset is traded against USDT
+        shares = self._normalize_shares(dict(shares))
+        self.assets = sorted([asset for asset in shares if asset != 'USDT'])
+        self.symbols = [f'{asset}USDT' for asset in self.assets]
+        self.symbol_infos = {symbol: self._query_broker(symbol) for symbol in self.symbols}
+        for symbol, symbol_info in self.symbol_infos.items():
+            assert len(symbol_info) != 0, f'Can\'t find {symbol} exchange pair'
+
+        # vectors over assets, USDT is the last entry of weights
+        self.weights = np.array([shares[asset] for asset in self.assets] + [shares.get('USDT', 0.0)])
+        self.step_sizes = np.array([self.symbol_infos[symbol]['stepSize'] for symbol in self.symbols])
+        self.min_qtys = np.array([self.symbol_infos[symbol]['minQty'] for symbol in self.symbols])
+
+        self.first_step = first_step
+        self.rebalance_condition = rebalance_condition  # absolute weight deviation that triggers a trade
+        self.total_assets = 0.0
+        self.deviation = np.zeros(len(self.weights))
+
+        self.pool = ThreadPoolExecutor(max_workers=3) if self.transport.concurrent else None
+
+    def _symbol_info(self, symbol):
+        return self.symbol_infos[symbol]
+
+    def fetch(self):
+        """
+        The whole basket in three calls: every book ticker, the account and the open orders
+        :return: (book tickers by symbol, balances by asset, open orders of basket symbols)
+        """
+        jobs = [lambda: self._hbtc_get_func(self.urls['bookTicker']),
+                lambda: self._hbtc_get_func(self.urls['account'], self.headers, self._get_params()),
+                lambda: self.query_now_orders()]
+        if self.pool is None:
+            tickers, account, orders = [job() for job in jobs]
+        else:
+            tickers, account, orders = [future.result() for future in [self.pool.submit(job) for job in jobs]]
+        books = {item['symbol']: item for item in tickers}
+        missing = [symbol for symbol in self.symbols if symbol not in books]
+        assert len(missing) == 0, f'No book ticker for {missing}'
+        balances = {item['assetName']: item for item in account['balances']}
+        orders = [order for order in orders if order['symbol'] in self.symbol_infos]
+        return books, balances, orders
+
+    def plan(self, books, balances, orders):
+        """
+        Vectorised share-weighted rebalance: deviation of every asset from its weight, one first_step chunk per asset
+        that is off by rebalance_condition or more, buys at the bid and sells at the ask
+        :return: (new orders as (symbol, side, price, quantity) with sells first, open orders to cancel),
+                 sizes are not yet capped by the free balances, see fit
+        """
+        bids = np.array([float(books[symbol]['bidPrice']) for symbol in self.symbols])
+        asks = np.array([float(books[symbol]['askPrice']) for symbol in self.symbols])
+        quantities = np.array([float(balances.get(asset, {'total': 0})['total']) for asset in self.assets])
+        usdt = float(balances.get('USDT', {'total': 0})['total'])
+
+        values = np.append(quantities * (bids + asks) * 0.5, usdt)
+        self.total_assets = values.sum()
+        self.deviation = values / self.total_assets - self.weights
+
+        # USDT absorbs every trade, positive notional buys the asset
+        chunk = self.total_assets * self.first_step
+        active = np.abs(self.deviation[:-1]) >= self.rebalance_condition
+        notional = np.where(active, np.clip(-self.deviation[:-1] * self.total_assets, -chunk, chunk), 0.0)
+        buy = notional > 0
+        prices = np.where(buy, bids, asks)
+        sizes = np.abs(notional) / prices
+        sizes = np.where(buy, sizes, np.minimum(sizes, quantities))
+        sizes = np.floor(sizes / self.step_sizes + 1e-9) * self.step_sizes
+        sides = np.where(buy, 'BUY', 'SELL')
+
+        # keep resting orders that already are the plan, cancel the rest
+        wanted = {(self.symbols[i], sides[i], prices[i]) for i in np.flatnonzero(active & (sizes >= self.min_qtys))}
+        kept, cancels = set(), list()
+        for order in orders:
+            key = (order['symbol'], order['side'], float(order['price']))
+            if key in wanted and key not in kept:
+                kept.add(key)
+            else:
+                cancels.append(order)
+
+        new_orders = [(symbol, str(side), float(price), float(size)) for symbol, side, price, size
+                      in zip(self.symbols, sides, prices, sizes) if (symbol, side, price) in wanted - kept]
+        new_orders.sort(key=lambda info: info[1] == 'BUY')
+        return new_orders, cancels
+
+    def fit(self, new_orders, available):
+        """
+        Cap sells by the free asset and scale buys to the free USDT, in one pass over the orders
+        :param available: asset -> free quantity, including what completed cancels released
+        """
+        if len(new_orders) == 0:
+            return list()
+        symbols, sides, prices, sizes = [np.array(column) for column in zip(*new_orders)]
+        positions = np.array([self.symbols.index(symbol) for symbol in symbols])
+        buy = sides == 'BUY'
+        free = np.array([available.get(self.assets[i], 0.0) for i in positions])
+        sizes = np.where(buy, sizes, np.minimum(sizes, free))
+        spend = (sizes * prices)[buy].sum()
+        if spend > available.get('USDT', 0.0):
+            sizes = np.where(buy, sizes * available.get('USDT', 0.0) / spend, sizes)
+        step_sizes, min_qtys = self.step_sizes[positions], self.min_qtys[positions]
+        sizes = np.floor(sizes / step_sizes + 1e-9) * step_sizes
+        return [(symbol, side, price, size) for symbol, side, price, size, valid
+                in zip(symbols.tolist(), sides.tolist(), prices.tolist(), sizes.tolist(), sizes >= min_qtys) if valid]
+
+    def step(self):
+        books, balances, orders = self.fetch()
+        new_orders, cancels = self.plan(books, balances, orders)
+        if len(new_orders) == 0 and len(cancels) == 0:
+            return list()
+        self.print_log_message('Basket: $%s, max deviation: %s, order: %s, cancel: %s', self.total_assets,
+                               np.abs(self.deviation).max(), len(new_orders), len(cancels))
+
+        # replacements need the funds their cancels free, so cancels complete first
+        results = self.executor.execute(cancels=cancels)
+        available = {asset: float(item['free']) for asset, item in balances.items()}
+        cancelled = {order['orderId']: order for order in cancels}
+        for result in results:
+            if not result.ok:
+                continue
+            order = cancelled[result.order_id]
+            remaining = float(order['origQty']) - float(order.get('executedQty', 0))
+            if order['side'] == 'BUY':
+                available['USDT'] = available.get('USDT', 0.0) + remaining * float(order['price'])
+            else:
+                asset = self.assets[self.symbols.index(order['symbol'])]
+                available[asset] = available.get(asset, 0.0) + remaining
+        results += self.executor.execute(orders=self.fit(new_orders, available))
+        self._show_failures(results)
+        return results
+
+
+if __name__ == '__main__':
+    # python cex_basket.py api_key secret_key
+    api_key, secret_key = sys.argv[1], sys.argv[2]
+    # ------------------------- Manual Parameters ---------------------------
+    shares = {'BTC': 3, 'ETH': 2, 'GRIN': 1, 'USDT': 4}
+    first_step = 0.005  # total asset as USDT ratio per order
+    rebalance_condition = 0.02
+    step_interval = 5.0
+    # -----------------------------------------------------------------------
+
+    basket = Basket(api_key=api_key, secret_key=secret_key, shares=shares,
+                    first_step=first_step, rebalance_condition=rebalance_condition,
+                    broker_snapshot='broker_info.json', limiter=Request_Scheduler())
+    basket.print_info_message('Basket of %s is standing by', basket.assets)
+
+    scheduler = Event_Scheduler(clock=basket.clock, on_error=lambda name, e: basket.print_warning_message(
+        '%s failed: %s', name, e))
+    scheduler.every(step_interval, basket.step)
+    scheduler.once(0.0, basket.step)
+    scheduler.run()
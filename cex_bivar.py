@@ -1,8 +1,19 @@
 import sys
 import time
+import traceback
 from queue import Queue
 
+from cex_bootstrap import Bivar_Bootstrap
+from cex_grid import Grid_Ladder
+from cex_journal import State_Journal
+from cex_metrics import METRICS, timed
 from cex_model import AMM_Model
+from cex_orderbook import Depth_Stream, Order_Book, Replay_Feed
+from cex_orders import Open_Order_Tracker
+from cex_portfolio import Portfolio_Ledger
+from cex_ratelimit import Request_Scheduler
+from cex_recorder import Market_Data_Recorder
+from cex_scheduler import Book_Move_Trigger, Event_Scheduler
 
 
 class Bivar(AMM_Model):
@@ -11,16 +22,54 @@ class Bivar(AMM_Model):
                  first_step=0.01, second_step=0.0,
                  second_order_depth=5,
                  symbol_name='GRIN',
+                 pool_size=10,
+                 order_concurrency=1,
+                 broker_snapshot=None,
+                 reconcile_interval=1.0,
+                 account_interval=60.0,
+                 fee_rate=0.0,
+                 second_ladder_band=200,
+                 transport=None,
+                 broker=None,
+                 market_cache=None,
+                 limiter=None,
+                 logger=None,
+                 journal_path=None,
+                 context=None,
                  ) -> None:
-        super().__init__(api_key, secret_key)
-
-        self.symbol_name = self._check_token(symbol_name)
-        self.symbol = self._check_pair(symbol_name + 'USDT')
-        self.symbol_info = self._query_broker(self.symbol)
-
-        self.account = self.check_account()
-        if len(self.account) != 2:
-            self.print_error_message('This procedure only support 2 assets')
+        super().__init__(api_key, secret_key, pool_size=pool_size, order_concurrency=order_concurrency,
+                         broker_snapshot=broker_snapshot, transport=transport, broker=broker, limiter=limiter,
+                         logger=logger)
+
+        # every startup fetch in one concurrent round-trip, pass a Bootstrap_Context to reuse one
+        if context is None:
+            bootstrap = Bivar_Bootstrap(self)
+            context = bootstrap.run(symbol_name, market_cache=market_cache)
+            bootstrap.shutdown()
+        self.print_info_message('Bootstrap %s in %.3fs', context.symbol, context.timings['total'], timings=context.timings)
+
+        self.symbol_name = context.symbol_name
+        self.symbol = context.symbol
+        self.symbol_info = dict(context.symbol_info)
+
+        # tick-scoped view of price, book ticker and depth for the pair
+        self.snapshot = context.snapshot
+        # streaming local order book, see attach_order_book
+        self.order_book = None
+        # local open orders keyed by price tick, reconciled with openOrders every reconcile_interval seconds
+        self.open_orders = Open_Order_Tracker(self.symbol_info['tickSize'], on_fill=self._on_fill,
+                                               on_partial_fill=self._credit, on_add=self._on_add, clock=self.clock)
+        self.reconcile_interval = reconcile_interval
+        # on_fill(order) hook for schedulers, called after the fill is recorded
+        self.on_fill = None
+        # set while second_resume settles orders filled during downtime, see _on_fill
+        self.resuming = False
+        # crash-safe ladder state and order ids, see second_resume
+        self.journal = None if journal_path is None else State_Journal(journal_path, self.symbol)
+        # balances kept from our own fills, the account endpoint is only read every account_interval seconds
+        self.portfolio = Portfolio_Ledger(self.symbol_name, fee_rate=fee_rate, reconcile_interval=account_interval,
+                                          clock=self.clock)
+        self.check_account(context.balances)
 
         self.ratio = 0.0
         self.shares = self._normalize_shares(shares)
@@ -31,74 +80,178 @@ class Bivar(AMM_Model):
         self.second_step = second_step
 
         self.second_order_depth = second_order_depth
-        self._second_lambda_build()
+        self.second_ladder_band = max(second_ladder_band, 2 * second_order_depth)
         self.second_orders = list()  # symbol, side, price, quantity
         self.second_total_orders = 0
 
-        self.second_fresh_base()
+        self.resumed = self.second_resume(context.open_orders)
+        if not self.resumed:
+            self.second_fresh_base()
 
     @property
     def total_assets(self):
-        return sum([float(p['total_usdt_price']) for p in self.account])
+        return self.portfolio.total_assets
 
     @property
     def free_assets(self):
-        return sum([float(p['free_usdt_price']) for p in self.account])
+        return self.portfolio.free_assets
 
     @property
     def locked_assets(self):
-        return sum([float(p['locked_usdt_price']) for p in self.account])
-
-    def check_account(self):
-        assets = [dict() for _ in range(2)]
-        for item in self._hbtc_get_func(self.urls['account'], self.headers, self._get_params())['balances']:
-            if item['assetName'] == self.symbol_name:
-                assets[0] = item
-            if item['assetName'] == 'USDT':
-                assets[1] = item
-
-        if len(assets[1]) == 1:
-            assets[1] = {'asset': 'USDT', 'assetId': 'USDT', 'assetName': 'USDT',
-                         'total': '0', 'free': '0', 'locked': '0'}
-
-        for asset in assets:
-            asset['total_usdt_price'] = str(float(asset['total']) * self._get_price_usdt(asset['assetName']))
-            asset['free_usdt_price'] = str(float(asset['free']) * self._get_price_usdt(asset['assetName']))
-            asset['locked_usdt_price'] = str(float(asset['locked']) * self._get_price_usdt(asset['assetName']))
-        return assets
+        return self.portfolio.locked_assets
+
+    def check_account(self, balances=None):
+        if balances is None:
+            balances = self._hbtc_get_func(self.urls['account'], self.headers, self._get_params())['balances']
+        drift = self.portfolio.reconcile(balances)
+        if self.portfolio.dirty:
+            self.print_warning_message('Ledger drifted %.6f from the account, reconciled', drift, drift=drift)
+        self.portfolio.mark(self._get_price_usdt(self.symbol_name))
+        return self.portfolio
 
     def update_ratio(self):
-        self.account = self.check_account()
-        ratio = float(self.account[0]['total_usdt_price']) / float(self.account[1]['total_usdt_price'])
-        return ratio
+        self.snapshot.refresh()
+        if self.portfolio.due:
+            # settle known fills first, the account already contains them
+            self.sync_open_orders(force=True)
+            self.check_account()
+        else:
+            self.portfolio.mark(self._get_price_usdt(self.symbol_name))
+        return self.portfolio.ratio
 
     def _get_book_price_usdt(self, symbol: str):
-        book_price_info = {'bidPrice': 1.0, 'askPrice': 1.0}
-        symbol = symbol.upper()
-        if symbol != 'USDT':
-            book_price_info = self._hbtc_get_func(self.urls['bookTicker'], params={'symbol': f'{symbol}USDT'})
-        return book_price_info
+        return self.snapshot.book_price_usdt(symbol)
 
     def _get_price_usdt(self, symbol: str):
-        return self._get_price(f'{symbol}USDT')
+        return self.snapshot.price_usdt(symbol)
+
+    def _get_order_depth(self):
+        return self.snapshot.depth
+
+    def attach_order_book(self, order_book):
+        self.order_book = order_book
+        self.snapshot.order_book = order_book
+
+    def stream_order_book(self, feed):
+        """
+        Mirror the pair's book from a depth feed, resyncing from REST depth after a gap
+        :param feed: iterable of depth messages, e.g. a websocket client, or a Replay_Feed path
+        :return: the started Depth_Stream
+        """
+        if isinstance(feed, str):
+            feed = Replay_Feed(feed)
+        order_book = Order_Book(self.symbol)
+        # resync from a fresh REST depth, not the tick snapshot
+        stream = Depth_Stream(order_book, feed, snapshot_func=super()._get_order_depth,
+                              on_trade=self._record_trade).start()
+        self.attach_order_book(order_book)
+        return stream
+
+    def attach_recorder(self, recorder):
+        self.snapshot.recorder = recorder
+
+    def _record_trade(self, message):
+        if self.snapshot.recorder is not None:
+            self.snapshot.recorder.on_trade(message)
+
+    def close(self):
+        # buffered recorder rows and the journal must reach the disk before exit
+        if self.snapshot.recorder is not None:
+            self.snapshot.recorder.close()
+        if self.journal is not None:
+            self.journal.close()
+        self.logger.flush()
+
+    def _best_level(self, side):
+        # read the local mirror when it is in sync, fall back to the polled depth
+        if self.order_book is not None and self.order_book.synced:
+            level = self.order_book.best(side)
+            if level is not None:
+                return level
+        order_book = self._get_order_depth()
+        level = order_book['bids'][0] if side == 'BUY' else order_book['asks'][0]
+        return float(level[0]), float(level[1])
+
+    def query_now_orders(self):
+        # only this pair: strategies sharing an API key must not see, count or cancel each other's orders
+        orders = self._hbtc_get_func(self.urls['openOrders'], self.headers, self._get_params({'symbol': self.symbol}))
+        if isinstance(orders, list):
+            orders = [order for order in orders if order['symbol'] == self.symbol]
+        self.open_orders.reconcile(orders)
+        return orders
+
+    def sync_open_orders(self, force=False):
+        if force or self.clock() - self.open_orders.reconciled >= self.reconcile_interval:
+            self.query_now_orders()
+        return self.open_orders.values()
+
+    def _track_results(self, results):
+        added, removed = list(), list()
+        for result in results:
+            if not result.ok:
+                # a timeout may still have reached the exchange, balances are unknown until reconciled
+                if result.error is not None:
+                    self.portfolio.invalidate()
+                continue
+            if result.action == 'NEW':
+                order = result.response
+                self.open_orders.add(order)
+                # the acknowledged price and quantity, after the exchange rounding; a marketable order may
+                # already be (partly) filled
+                self.portfolio.lock(result.side, order['price'], order['origQty'])
+                self._credit(order, self.open_orders.executed(order))
+                added.append(order)
+                continue
+            order = self.open_orders.remove(result.order_id)
+            if order is not None:
+                # the cancel reply carries what filled before it, only the rest goes back to free
+                executed = max(self.open_orders.executed(result.response), self.open_orders.executed(order))
+                self._credit(order, executed - self.open_orders.executed(order))
+                self.portfolio.unlock(order['side'], order['price'], float(order['origQty']) - executed)
+                removed.append(result.order_id)
+        if self.journal is not None:
+            self.journal.record(added, removed)
+        return results
+
+    def _on_add(self, order):
+        # orders placed before a crash or by another session are journaled like our own
+        if self.journal is not None:
+            self.journal.record(added=[order])
+
+    def _credit(self, order, quantity):
+        # balances loaded at startup already contain fills made while we were down
+        if quantity > 0 and not self.resuming:
+            self.portfolio.fill(order['side'], order['price'], quantity)
+
+    def _on_fill(self, order):
+        # partial fills seen earlier are already in the ledger
+        self._credit(order, float(order['origQty']) - self.open_orders.executed(order))
+        if self.journal is not None:
+            self.journal.record(removed=[order['orderId']])
+        if self.on_fill is not None:
+            self.on_fill(order)
+
+    def _make_order(self, orders, cancels=()):
+        return self._track_results(super()._make_order(orders, cancels=cancels))
+
+    def delete_orders(self, orders):
+        return self._track_results(super().delete_orders(orders))
+
+    def _second_price_tick(self, price_idx):
+        return self.second_ladder.price_tick(price_idx)
 
     def is_best_price(self, order):
         order_price, order_quantity = float(order['price']), float(order['origQty'])
-
-        order_book = self._get_order_depth()
-        if order['side'] == 'BUY':
-            new_price, quantity = float(order_book['bids'][0][0]), float(order_book['bids'][0][1])
-        else:
-            new_price, quantity = float(order_book['asks'][0][0]), float(order_book['asks'][0][1])
-
+        new_price, quantity = self._best_level(order['side'])
         return (new_price == order_price) and (order_quantity != quantity)
 
+    @timed('first_balance_symbol2usdt')
     def first_balance_symbol2usdt(self):
         side = 'BUY' if self.ratio < self.ratio_ab else 'SELL'
 
         order_step = self.total_assets * self.first_step
-        symbol_book_info = self._get_book_price_usdt(self.account[0]['assetName'])
-        symbol_quantity, usdt = float(self.account[0]['total']), float(self.account[1]['total'])
+        symbol_book_info = self._get_book_price_usdt(self.symbol_name)
+        symbol_quantity, usdt = self.portfolio.base.total, self.portfolio.quote.total
 
         price = float(symbol_book_info['bidPrice']) if side == 'BUY' else float(symbol_book_info['askPrice'])
         delta_qty = abs((self.ratio_ab * usdt - price * symbol_quantity) / (price * (1 + self.ratio_ab)))
@@ -107,77 +260,90 @@ class Bivar(AMM_Model):
         for item in operation_assets:
             self.order_book_queue.put((self.symbol, side, price, item / price))
 
-        self.print_log_message(f'Step 1: ${self.total_assets}, ratio: {self.ratio}, order: {(len(operation_assets))}')
+        self.print_log_message('Step 1: $%s, ratio: %s, order: %s', self.total_assets, self.ratio, len(operation_assets))
         self._make_order(self.order_book_queue)
 
-    def _second_delete_orders(self, price_idxes):
+    def _second_delete_targets(self, price_idxes):
         orders = list()
-        _, prices, _ = self._second_price_idx2info(price_idxes)
-        for history_order in self.query_now_orders():
-            for price in prices:
-                if float(history_order['price']) == float(round(price, self.symbol_info['pricePrecision'])):
-                    orders.append(history_order)
-                    break
-        self.delete_orders(orders)
-
-    def _second_lambda_build(self):
-        # bp: base price, bq: base_quantity
-        self.new_price = lambda bp, j, step: round(bp * pow(1 + step, j), self.symbol_info['pricePrecision'])
-        # rate: a token / (a token + USDT)
-        # self.delta_qty = lambda bq, step, rate, j: round(
-        #     bq * pow(1 + step * rate, j - 1) * step * rate * (1 - rate) / pow(1 + step, j),
-        #     self.symbol_info['quantityPrecision'])
-        self.delta_qty = lambda bq, step, ratio_ab, j: round(abs(pow(1 + step, j) - 1) * bq / (1 + ratio_ab),
-                                                             self.symbol_info['quantityPrecision'])
-
-    def _second_make_orders(self, price_idxes):
+        for price_idx in price_idxes:
+            orders += self.open_orders.at(self._second_price_tick(price_idx))
+        return orders
+
+    @property
+    def second_center(self):
+        return sum(self.second_idx_list) / len(self.second_idx_list)
+
+    def _second_make_orders(self, price_idxes, cancels=()):
+        # innermost buy/sell pair first
         sides, prices, delta_qties = self._second_price_idx2info(price_idxes)
         for idx1, idx2 in ([[i, -i - 1] for i in range(len(sides) // 2)][::-1]):
             self.order_book_queue.put((self.symbol, sides[idx1], prices[idx1], delta_qties[idx1]))
             self.order_book_queue.put((self.symbol, sides[idx2], prices[idx2], delta_qties[idx2]))
-        self._make_order(self.order_book_queue)
+        # the window moves into the levels it cancels, so cancels complete before the replacements go out
+        results = self.delete_orders(cancels) if len(cancels) else list()
+        return results + self._make_order(self.order_book_queue)
 
     def _second_price_idx2info(self, price_idxes):
-        sides, prices, delta_qtys = list(), list(), list()
-        for price_idx in price_idxes:
-            side = 'SELL' if price_idx > (sum(self.second_idx_list) / len(self.second_idx_list)) else 'BUY'
-            price = self.new_price(self.second_base_price, price_idx, self.second_step)
-            delta_qty = self.delta_qty(self.second_base_qty, self.second_step, self.ratio_ab, price_idx)
-            sides.append(side)
-            prices.append(price)
-            delta_qtys.append(delta_qty)
-        return sides, prices, delta_qtys
+        return self.second_ladder.info(price_idxes, self.second_center)
 
     def second_fresh_base(self):
         self.second_total_orders = 0
-        order_book = self._get_order_depth()
-
-        self.second_base_price = (float(order_book['bids'][0][0]) + float(order_book['asks'][0][0])) * 0.5
-        self.second_base_qty = float(self.account[0]['total'])
-
-        self.second_idx_list = list(range(self.second_order_depth, 0, -1)) + list(
-            range(-1, -self.second_order_depth - 1, -1))
-
+        self.second_base_price = (self._best_level('BUY')[0] + self._best_level('SELL')[0]) * 0.5
+        self.second_base_qty = self.portfolio.base.total
+        # prices, quantities and ticks of every level in the band, precomputed once per base
+        self.second_ladder = Grid_Ladder(self.second_base_price, self.second_base_qty, self.second_step,
+                                         self.ratio_ab, self.symbol_info, band=self.second_ladder_band)
+
+        self.second_idx_list = self.second_ladder.window(0, self.second_order_depth)
+        self._second_save()
+
+    def _second_save(self):
+        if self.journal is not None:
+            self.journal.save_ladder(self.second_base_price, self.second_base_qty, self.second_idx_list,
+                                     self.second_total_orders)
+
+    def second_resume(self, open_orders=None):
+        """
+        Restore the ladder from the journal and reconcile it with openOrders instead of rebuilding it.
+        Journaled orders gone from the exchange were filled while we were down and are left for
+        second_get_now_order_idxes to pick up; unknown orders off the ladder are cancelled.
+        :param open_orders: openOrders response already fetched, queried when None
+        :return: False if there is nothing to resume
+        """
+        state = None if self.journal is None else self.journal.load_ladder()
+        if state is None:
+            return False
+        self.second_base_price, self.second_base_qty = state['base_price'], state['base_qty']
+        self.second_idx_list, self.second_total_orders = state['idx_list'], state['total_orders']
+        self.second_ladder = Grid_Ladder(self.second_base_price, self.second_base_qty, self.second_step,
+                                         self.ratio_ab, self.symbol_info, band=self.second_ladder_band)
+
+        for order in self.journal.load_orders():
+            self.open_orders.add(order)
+        self.resuming = True
+        try:
+            if open_orders is None:
+                self.query_now_orders()
+            else:
+                self.open_orders.reconcile(open_orders)
+        finally:
+            self.resuming = False
+
+        ladder_ticks = {self._second_price_tick(price_idx) for price_idx in self.second_idx_list}
+        strays = [order for order in self.open_orders.values() if self.open_orders.tick(order['price']) not in ladder_ticks]
+        self.delete_orders(strays)
+        self.print_info_message('Resumed ladder: %s levels, %s open orders, %s strays cancelled',
+                                len(self.second_idx_list), len(self.open_orders), len(strays))
+        return True
+
+    @timed('second_get_now_order_idxes')
     def second_get_now_order_idxes(self):
-        history_orders = self.query_now_orders()
-        if len(history_orders) == len(self.second_idx_list):
+        if len(self.open_orders) == len(self.second_idx_list):
             return list()
-        history_prices = sorted([float(order['price']) for order in history_orders])
-
-        complete_order_idxes = list()
-        for idx, prc_idx in enumerate(self.second_idx_list):
-            flag = True
-            for his_prc in history_prices:
-                _tem = round(self.new_price(self.second_base_price, prc_idx, self.second_step),
-                             self.symbol_info['pricePrecision'])
-                if his_prc == _tem:
-                    flag = False
-                    break
-            if flag:
-                complete_order_idxes.append(prc_idx)
-
-        return complete_order_idxes
+        return [prc_idx for prc_idx in self.second_idx_list
+                if not self.open_orders.has(self._second_price_tick(prc_idx))]
 
+    @timed('second_fresh_idx_list')
     def second_fresh_idx_list(self, complete_order_idxes: list):
         if len(complete_order_idxes) == 0:
             return
@@ -185,24 +351,50 @@ class Bivar(AMM_Model):
             new_order_idxes = self.second_idx_list
             delete_order_idxes = list()
         else:
-            if sum(complete_order_idxes) > (sum(self.second_idx_list) / len(self.second_idx_list)):
-                standard_index = complete_order_idxes[0]
-                order_idxes = list(range(standard_index + self.second_order_depth, standard_index, -1))
-                order_idxes += list(range(standard_index - 1, standard_index - 1 - self.second_order_depth, -1))
-            elif sum(complete_order_idxes) < (sum(self.second_idx_list) / len(self.second_idx_list)):
-                standard_index = complete_order_idxes[-1]
-                order_idxes = list(range(standard_index + self.second_order_depth, standard_index, -1))
-                order_idxes += list(range(standard_index - 1, standard_index - self.second_order_depth - 1, -1))
+            if sum(complete_order_idxes) > self.second_center:
+                order_idxes = self.second_ladder.window(complete_order_idxes[0], self.second_order_depth)
+            elif sum(complete_order_idxes) < self.second_center:
+                order_idxes = self.second_ladder.window(complete_order_idxes[-1], self.second_order_depth)
             else:
                 order_idxes = self.second_idx_list
             cur_orders = set(self.second_idx_list) - set(complete_order_idxes)
             new_order_idxes = sorted(list(set(order_idxes) - cur_orders), reverse=True)
             delete_order_idxes = sorted(list(cur_orders - set(order_idxes)), reverse=True)
             self.second_idx_list = order_idxes
-        self.print_log_message(f'Step 2: ${self.total_assets}, ratio: {self.ratio} order: {len(self.second_idx_list)}')
-        self._second_delete_orders(delete_order_idxes)
-        self._second_make_orders(new_order_idxes)
+        self.print_log_message('Step 2: $%s, ratio: %s order: %s', self.total_assets, self.ratio, len(self.second_idx_list))
+        cancels = self._second_delete_targets(delete_order_idxes)
+        results = self._second_make_orders(new_order_idxes, cancels=cancels)
         self.second_total_orders += len(new_order_idxes)
+        self._second_save()
+        return results
+
+    def refresh_tick(self):
+        if METRICS.enabled:
+            self.tick_started = time.perf_counter()
+        self.update_ratio()
+        orders = self.sync_open_orders()
+        # fills found by the sync are already in the ledger
+        self.ratio = self.portfolio.ratio
+        return orders
+
+    def main_step(self, orders, balance_ratio_condition, second_total_orders_threshold, restart=False):
+        # Condition 1
+        if abs(self.ratio_ab - self.ratio) >= balance_ratio_condition:
+            if len(orders) == 0:
+                self.first_balance_symbol2usdt()
+            elif len(orders) > 1 or (not self.is_best_price(orders[0])):
+                self.delete_orders(orders)
+                self.first_balance_symbol2usdt()
+
+        # Condition 2
+        else:
+            if (len(orders) <= 1) or restart or (self.second_total_orders >= second_total_orders_threshold):
+                self.delete_orders(orders)
+                self.second_fresh_base()
+                idxes = self.second_idx_list
+            else:
+                idxes = self.second_get_now_order_idxes()
+            self.second_fresh_idx_list(idxes)
 
 
 if __name__ == '__main__':
@@ -218,16 +410,39 @@ if __name__ == '__main__':
     first_step, second_step = 0.005, 0.01  # total asset as USDT ratio
     second_order_depth = 5
     second_total_orders_threshold = 100
-    second_restart_time = '03000'
+    second_restart_time = '03:00:00'
+    book_move_threshold = 0.005  # relative mid move that triggers a step
+    poll_interval, idle_interval = 1.0, 60.0  # fill/book polling, fallback step
+    metrics_jsonl, metrics_port = 'metrics.jsonl', 9108  # None disables either export
+    order_concurrency = 4  # parallel order/cancel requests
+    broker_snapshot = 'broker_info.json'  # warm restarts skip brokerInfo downloads
+    journal_path = 'cexamm_state.db'  # warm restarts keep the ladder and its queue priority
+    depth_feed = None  # depth message iterable or Replay_Feed path, None keeps polling REST depth
+    recorder_dir = None  # directory for recorded book ticks and trades, None disables recording
     # -----------------------------------------------------------------------
 
     # Initiate monitor
+    if metrics_jsonl is not None or metrics_port is not None:
+        METRICS.enable()
+        if metrics_jsonl is not None:
+            METRICS.write_jsonl(metrics_jsonl)
+        if metrics_port is not None:
+            METRICS.serve_prometheus(metrics_port)
     bivar = Bivar(api_key=api_key, secret_key=secret_key,
                   shares=shares,
                   first_step=first_step, second_step=second_step,
                   second_order_depth=second_order_depth,
                   symbol_name=symbol_name,
+                  order_concurrency=order_concurrency,
+                  broker_snapshot=broker_snapshot,
+                  limiter=Request_Scheduler(),
+                  journal_path=journal_path,
                   )
+    if recorder_dir is not None:
+        bivar.attach_recorder(Market_Data_Recorder(recorder_dir, bivar.symbol, bivar.symbol_info['tickSize'],
+                                                   bivar.symbol_info['stepSize']))
+    if depth_feed is not None:
+        bivar.stream_order_book(depth_feed)
     bivar.print_info_message(f'CexAMM is standing by!!!!!!!!')
 
     # AMM condition
@@ -235,37 +450,50 @@ if __name__ == '__main__':
         bivar.print_error_message("Charge some USDT! BABY!!")
 
     bivar.ratio = bivar.update_ratio()
-    orders = bivar.query_now_orders()
-    bivar.print_log_message(f'CexAMM is completed! ${bivar.total_assets}, ratio: {bivar.ratio}, order: {len(orders)}')
+    orders = bivar.sync_open_orders(force=True)
+    bivar.print_log_message('CexAMM is completed! $%s, ratio: %s, order: %s', bivar.total_assets, bivar.ratio, len(orders))
 
-    # restart step2
-    if abs(bivar.ratio_ab - bivar.ratio) < balance_ratio_condition:
+    # restart step2, unless the ladder was resumed from the journal
+    if not bivar.resumed and abs(bivar.ratio_ab - bivar.ratio) < balance_ratio_condition:
         bivar.delete_orders(orders)
 
-    # Main Procedure
-    while True:
-        # Condition 1
-        if abs(bivar.ratio_ab - bivar.ratio) >= balance_ratio_condition:
-            if len(orders) == 0:
-                bivar.first_balance_symbol2usdt()
-            elif len(orders) > 1 or (not bivar.is_best_price(orders[0])):
-                bivar.delete_orders(orders)
-                bivar.first_balance_symbol2usdt()
-
-        # Condition 2
-        else:
-            if (len(orders) <= 1) or (bivar.now[:5] == second_restart_time) or (
-                    bivar.second_total_orders >= second_total_orders_threshold):
-                if bivar.now[:5] == second_restart_time:
-                    time.sleep(10)
-                bivar.delete_orders(orders)
-                bivar.second_fresh_base()
-                idxes = bivar.second_idx_list
-            else:
-                idxes = bivar.second_get_now_order_idxes()
-            bivar.second_fresh_idx_list(idxes)
-
-        # restart information
-        time.sleep(1)
-        bivar.ratio = bivar.update_ratio()
-        orders = bivar.query_now_orders()
+    # Main Procedure: steps run on fills, book moves and timers
+    scheduler = Event_Scheduler(clock=bivar.clock, on_error=lambda name, e: bivar.print_warning_message(
+        '%s failed: %s', name, ''.join(traceback.format_exception_only(type(e), e)).strip()))
+    book_trigger = Book_Move_Trigger(scheduler, book_move_threshold)
+    bivar.on_fill = lambda order: scheduler.post('fill', order)
+
+    rebalance_pending = [False]
+
+    def rebalance():
+        rebalance_pending[0] = False
+        step()
+
+    def step(payload=None, restart=False):
+        orders = bivar.refresh_tick()
+        bivar.main_step(orders, balance_ratio_condition, second_total_orders_threshold, restart=restart)
+        book_trigger.reset(bivar.snapshot.price)
+        # keep rebalancing every second until the ratio is back in range
+        if abs(bivar.ratio_ab - bivar.ratio) >= balance_ratio_condition and not rebalance_pending[0]:
+            rebalance_pending[0] = True
+            scheduler.once(1.0, rebalance)
+
+    def poll():
+        bivar.sync_open_orders(force=True)
+        mid = bivar.order_book.mid if bivar.order_book is not None and bivar.order_book.synced else None
+        book_trigger.update(bivar._get_price(bivar.symbol) if mid is None else mid)
+
+    scheduler.on('fill', step)
+    scheduler.on('book', step)
+    scheduler.every(poll_interval, poll)
+    scheduler.every(idle_interval, step)
+    scheduler.daily(second_restart_time, lambda: step(restart=True))
+    scheduler.every(3600, lambda: bivar.print_info_message(
+        'Connections: %s, reaction latency: %s', bivar.transport.stats, scheduler.latency))
+
+    # the first step runs inside the loop, so a failure is retried by the next timer instead of exiting
+    scheduler.once(0.0, step)
+    try:
+        scheduler.run()
+    finally:
+        bivar.close()
@@ -0,0 +1,85 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from cex_snapshot import Market_Snapshot
+
+
+class Bootstrap_Context(object):
+
+    def __init__(self, symbol_name, symbol) -> None:
+        super().__init__()
+
+        self.symbol_name = symbol_name
+        self.symbol = symbol
+        self.token_info = dict()
+        self.symbol_info = dict()
+        self.snapshot = None
+        self.balances = list()
+        self.open_orders = list()
+        # step -> seconds, 'total' is the wall time of the whole bootstrap
+        self.timings = dict()
+
+
+class Bivar_Bootstrap(object):
+
+    def __init__(self, model, workers=8) -> None:
+        super().__init__()
+
+        # every startup fetch is independent, so they all go out in one concurrent batch
+        self.model = model
+        self.pool = ThreadPoolExecutor(max_workers=workers) if model.transport.concurrent else None
+
+    def _timed(self, timings, step, func):
+        def wrapper():
+            start = time.perf_counter()
+            try:
+                return func()
+            finally:
+                timings[step] = time.perf_counter() - start
+        return wrapper
+
+    def _run(self, jobs, timings):
+        jobs = {step: self._timed(timings, step, func) for step, func in jobs.items()}
+        if self.pool is None:
+            return {step: func() for step, func in jobs.items()}
+        futures = {step: self.pool.submit(func) for step, func in jobs.items()}
+        return {step: future.result() for step, future in futures.items()}
+
+    def _broker(self, symbol_name, symbol):
+        # both lookups share one brokerInfo download through the broker cache
+        return self.model.broker.get(symbol_name), self.model.broker.get(symbol)
+
+    def run(self, symbol_name, market_cache=None):
+        """
+        Fetch what Bivar needs before it can trade: broker filters, the snapshot prefetch set, balances and
+        open orders. The pair check reuses the snapshot price instead of its own price call.
+        :return: a Bootstrap_Context
+        """
+        model = self.model
+        context = Bootstrap_Context(symbol_name, symbol_name + 'USDT')
+        snapshot = Market_Snapshot(model, context.symbol, market_cache=market_cache)
+
+        start = time.perf_counter()
+        jobs = {'broker': lambda: self._broker(context.symbol_name, context.symbol),
+                'account': lambda: model._hbtc_get_func(model.urls['account'], model.headers, model._get_params()),
+                'openOrders': lambda: model._hbtc_get_func(model.urls['openOrders'], model.headers,
+                                                           model._get_params({'symbol': context.symbol}))}
+        jobs.update({key: snapshot.fetchers[key] for key in snapshot.prefetch})
+        results = self._run(jobs, context.timings)
+        context.timings['total'] = time.perf_counter() - start
+
+        context.token_info, context.symbol_info = results.pop('broker')
+        context.balances = results.pop('account')['balances']
+        # other pairs traded on the same API key stay out of this strategy's view
+        open_orders = results.pop('openOrders')
+        context.open_orders = [order for order in open_orders if order['symbol'] == context.symbol] \
+            if isinstance(open_orders, list) else list()
+        context.snapshot = snapshot.prime(results)
+
+        assert len(context.token_info) != 0, f'Can\'t find {context.symbol_name}'
+        assert snapshot.price != -1, f'Can\'t find {context.symbol} exchange pair'
+        return context
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
@@ -0,0 +1,71 @@
+import os
+import json
+import time
+import threading
+
+
+def _decode_symbol(item):
+    price_filter, lot_filter = item['filters'][0], item['filters'][1]
+    return {
+        'minPrice': float(price_filter['minPrice']),
+        'maxPrice': float(price_filter['maxPrice']),
+        'tickSize': float(price_filter['tickSize']),
+        'pricePrecision': len(price_filter['tickSize'].split('.')[1]),
+        'minQty': float(lot_filter['minQty']),
+        'maxQty': float(lot_filter['maxQty']),
+        'stepSize': float(lot_filter['stepSize']),
+        'quantityPrecision': len(lot_filter['stepSize'].split('.')[1]),
+    }
+
+
+class Broker_Cache(object):
+
+    def __init__(self, fetch_func, ttl=3600, snapshot_path=None) -> None:
+        super().__init__()
+
+        # fetch_func() -> raw brokerInfo response
+        self.fetch_func = fetch_func
+        self.ttl = ttl
+        self.snapshot_path = snapshot_path
+
+        self.symbols = dict()
+        self.updated = 0.0
+        # one download even when many strategies share the cache
+        self.lock = threading.Lock()
+        self._load_snapshot()
+
+    @property
+    def expired(self):
+        return time.time() - self.updated >= self.ttl
+
+    def _load_snapshot(self):
+        if self.snapshot_path is None or not os.path.exists(self.snapshot_path):
+            return
+        with open(self.snapshot_path, 'r') as f:
+            snapshot = json.load(f)
+        self.symbols, self.updated = snapshot['symbols'], snapshot['updated']
+
+    def _save_snapshot(self):
+        if self.snapshot_path is None:
+            return
+        temp_path = self.snapshot_path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump({'updated': self.updated, 'symbols': self.symbols}, f)
+        os.replace(temp_path, self.snapshot_path)
+
+    def refresh(self):
+        symbols = dict()
+        for item in self.fetch_func()['symbols']:
+            symbols[item['symbol']] = _decode_symbol(item)
+        self.symbols, self.updated = symbols, time.time()
+        self._save_snapshot()
+        return self.symbols
+
+    def get(self, symbol):
+        with self.lock:
+            if self.expired:
+                self.refresh()
+        return self.symbols.get(symbol.upper(), dict())
+
+    def __contains__(self, symbol):
+        return len(self.get(symbol)) != 0
@@ -0,0 +1,63 @@
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from cex_metrics import METRICS
+
+# action: 'NEW' or 'CANCEL'; response is the decoded exchange reply, error the raised exception
+Order_Result = namedtuple('Order_Result', ['action', 'symbol', 'side', 'price', 'quantity',
+                                           'order_id', 'ok', 'response', 'error'])
+
+
+def _is_ok(response):
+    return isinstance(response, dict) and response.get('code') is None
+
+
+class Order_Executor(object):
+
+    def __init__(self, model, concurrency=1) -> None:
+        super().__init__()
+
+        self.model = model
+        self.concurrency = max(1, int(concurrency))
+        self.pool = ThreadPoolExecutor(max_workers=self.concurrency) if self.concurrency > 1 else None
+
+    def _new(self, info):
+        symbol, side, price, quantity = info
+        try:
+            req = self.model._order_temp(symbol=symbol, side=side, price=price, quantity=quantity)
+            if METRICS.enabled and self.model.tick_started is not None:
+                METRICS.observe('tick_to_ack_seconds', '', time.perf_counter() - self.model.tick_started)
+            order_id = req.get('orderId') if isinstance(req, dict) else None
+            return Order_Result('NEW', symbol, side, price, quantity, order_id, _is_ok(req), req, None)
+        except Exception as e:
+            return Order_Result('NEW', symbol, side, price, quantity, None, False, None, e)
+
+    def _cancel(self, order):
+        symbol, side, price, quantity = order.get('symbol'), order.get('side'), order.get('price'), order.get('origQty')
+        try:
+            req = self.model._cancel_temp(order['orderId'])
+            return Order_Result('CANCEL', symbol, side, price, quantity, order['orderId'], _is_ok(req), req, None)
+        except Exception as e:
+            return Order_Result('CANCEL', symbol, side, price, quantity, order['orderId'], False, None, e)
+
+    def _run(self, jobs):
+        # jobs are submitted in priority order, results keep that order
+        if self.pool is None:
+            return [func(arg) for func, arg in jobs]
+        futures = [self.pool.submit(func, arg) for func, arg in jobs]
+        return [future.result() for future in futures]
+
+    def execute(self, cancels=(), orders=()):
+        """
+        Send cancels and new orders together, cancels first
+        :param cancels: open order dicts carrying 'orderId'
+        :param orders: (symbol, side, price, quantity) tuples, highest priority first
+        :return: a list of Order_Result
+        """
+        jobs = [(self._cancel, order) for order in cancels] + [(self._new, info) for info in orders]
+        return self._run(jobs)
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
@@ -0,0 +1,56 @@
+import numpy as np
+
+
+class Grid_Ladder(object):
+
+    def __init__(self, base_price, base_qty, step, ratio_ab, symbol_info, band=200) -> None:
+        super().__init__()
+
+        self.base_price = base_price
+        self.base_qty = base_qty
+        self.step = step
+        self.ratio_ab = ratio_ab
+        self.symbol_info = symbol_info
+        self._build(band)
+
+    def _build(self, band):
+        # level j: price = bp * (1 + step) ** j, quantity = |(1 + step) ** j - 1| * bq / (1 + ratio_ab)
+        self.band = band
+        self.idxes = np.arange(-band, band + 1, dtype=np.int64)
+        growth = np.power(1 + self.step, self.idxes.astype(np.float64))
+        self.prices = np.round(self.base_price * growth, self.symbol_info['pricePrecision'])
+        self.quantities = np.round(np.abs(growth - 1) * self.base_qty / (1 + self.ratio_ab),
+                                   self.symbol_info['quantityPrecision'])
+        self.price_ticks = np.rint(self.prices / self.symbol_info['tickSize']).astype(np.int64)
+        self.quantity_lots = np.rint(self.quantities / self.symbol_info['stepSize']).astype(np.int64)
+
+    def _positions(self, price_idxes):
+        price_idxes = np.asarray(price_idxes, dtype=np.int64)
+        if len(price_idxes) and np.abs(price_idxes).max() > self.band:
+            self._build(max(2 * self.band, int(np.abs(price_idxes).max())))
+        return price_idxes + self.band
+
+    def price(self, price_idx):
+        # positions first, they may rebuild the arrays
+        position = self._positions([price_idx])[0]
+        return float(self.prices[position])
+
+    def price_tick(self, price_idx):
+        position = self._positions([price_idx])[0]
+        return int(self.price_ticks[position])
+
+    def info(self, price_idxes, center):
+        """
+        Sides, prices and quantities of several levels in one pass
+        :param center: levels above it sell, the others buy
+        :return: three lists
+        """
+        positions = self._positions(price_idxes)
+        sides = np.where(self.idxes[positions] > center, 'SELL', 'BUY')
+        return sides.tolist(), self.prices[positions].tolist(), self.quantities[positions].tolist()
+
+    def window(self, standard_index, depth):
+        # [s + depth, ..., s + 1, s - 1, ..., s - depth]
+        positions = self._positions([standard_index - depth, standard_index + depth])
+        levels = self.idxes[positions[0]:positions[1] + 1][::-1]
+        return np.delete(levels, depth).tolist()
@@ -0,0 +1,60 @@
+import json
+import time
+import sqlite3
+import threading
+
+
+class State_Journal(object):
+
+    def __init__(self, path, symbol) -> None:
+        super().__init__()
+
+        self.symbol = symbol.upper()
+        # WAL + synchronous FULL: every committed write survives a crash
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=FULL')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS ladder (symbol TEXT PRIMARY KEY, base_price REAL, base_qty REAL, '
+                          'idx_list TEXT, total_orders INTEGER, updated REAL)')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS orders (order_id TEXT PRIMARY KEY, symbol TEXT, side TEXT, '
+                          'price TEXT, quantity TEXT, updated REAL)')
+        self.lock = threading.Lock()
+
+    def save_ladder(self, base_price, base_qty, idx_list, total_orders):
+        with self.lock:
+            self.conn.execute('INSERT OR REPLACE INTO ladder VALUES (?, ?, ?, ?, ?, ?)',
+                              (self.symbol, base_price, base_qty, json.dumps(idx_list), total_orders, time.time()))
+
+    def load_ladder(self):
+        with self.lock:
+            row = self.conn.execute('SELECT base_price, base_qty, idx_list, total_orders FROM ladder WHERE symbol = ?',
+                                    (self.symbol,)).fetchone()
+        if row is None:
+            return None
+        return {'base_price': row[0], 'base_qty': row[1], 'idx_list': json.loads(row[2]), 'total_orders': row[3]}
+
+    def record(self, added=(), removed=()):
+        """
+        :param added: order dicts placed on the exchange
+        :param removed: orderIds cancelled or filled
+        """
+        if not added and not removed:
+            return
+        now = time.time()
+        with self.lock:
+            self.conn.execute('BEGIN')
+            self.conn.executemany('INSERT OR REPLACE INTO orders VALUES (?, ?, ?, ?, ?, ?)',
+                                  [(str(order['orderId']), self.symbol, order['side'], str(order['price']),
+                                    str(order['origQty']), now) for order in added])
+            self.conn.executemany('DELETE FROM orders WHERE order_id = ?', [(str(order_id),) for order_id in removed])
+            self.conn.execute('COMMIT')
+
+    def load_orders(self):
+        with self.lock:
+            rows = self.conn.execute('SELECT order_id, side, price, quantity FROM orders WHERE symbol = ?',
+                                     (self.symbol,)).fetchall()
+        return [{'orderId': order_id, 'symbol': self.symbol, 'side': side, 'price': price, 'origQty': quantity}
+                for order_id, side, price, quantity in rows]
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,76 @@
+import sys
+import json
+import time
+import queue
+import threading
+
+LEVELS = {'DEBUG': 10, 'LOGS': 15, 'INFO': 20, 'WARNING': 30, 'ERROR': 40}
+
+
+class Async_Logger(object):
+
+    def __init__(self, stream=None, level='LOGS', batch=256) -> None:
+        super().__init__()
+
+        self.stream = sys.stdout if stream is None else stream
+        self.level = LEVELS[level]
+        self.batch = batch
+
+        # records are formatted and written by one background thread, the caller only enqueues
+        self.queue = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self._writer, daemon=True)
+        self.thread.start()
+
+    def set_level(self, level):
+        self.level = LEVELS[level]
+
+    def enabled_for(self, level):
+        return LEVELS[level] >= self.level
+
+    def log(self, level, message, *args, **fields):
+        """
+        :param message: %-style format string, only rendered by the writer thread
+        :param fields: extra structured keys of the JSON record
+        """
+        if LEVELS[level] < self.level:
+            return
+        self.queue.put((time.time(), level, message, args, fields))
+
+    def _format(self, record):
+        timestamp, level, message, args, fields = record
+        try:
+            message = message % args if args else str(message)
+        except (TypeError, ValueError):
+            message = ' '.join([str(message)] + [str(arg) for arg in args])
+        data = {'time': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp)) + f'.{int(timestamp * 1000) % 1000:03d}',
+                'level': level, 'message': message}
+        data.update(fields)
+        return json.dumps(data, default=str)
+
+    def _writer(self):
+        while True:
+            records = [self.queue.get()]
+            while len(records) < self.batch:
+                try:
+                    records.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            lines, waiters = list(), list()
+            for record in records:
+                if isinstance(record, threading.Event):
+                    waiters.append(record)
+                else:
+                    lines.append(self._format(record))
+            if lines:
+                self.stream.write('\n'.join(lines) + '\n')
+                self.stream.flush()
+            for waiter in waiters:
+                waiter.set()
+
+    def flush(self, timeout=5.0):
+        event = threading.Event()
+        self.queue.put(event)
+        event.wait(timeout)
+
+
+LOGGER = Async_Logger()
@@ -0,0 +1,133 @@
+import json
+import time
+import threading
+from bisect import bisect_left
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# upper bounds in seconds, 50us .. 10s
+BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+           0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# metric -> label name
+LABELS = {
+    'request_seconds': 'endpoint',
+    'phase_seconds': 'phase',
+    'tick_to_ack_seconds': None,
+}
+
+
+class Histogram(object):
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.counts = [0] * (len(BUCKETS) + 1)  # the last one is +Inf
+        self.sum, self.count = 0.0, 0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def quantile(self, q):
+        rank, seen = q * self.count, 0
+        for bound, count in zip(BUCKETS + (float('inf'),), self.counts):
+            seen += count
+            if seen >= rank and count:
+                return bound
+        return 0.0
+
+
+class Metrics(object):
+
+    def __init__(self) -> None:
+        super().__init__()
+
+        # checked first on every hot path, nothing else runs while disabled
+        self.enabled = False
+        self.histograms = {name: dict() for name in LABELS}
+        self.lock = threading.Lock()
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def observe(self, name, label, seconds):
+        with self.lock:
+            histogram = self.histograms[name].get(label)
+            if histogram is None:
+                histogram = self.histograms[name][label] = Histogram()
+            histogram.observe(seconds)
+
+    def snapshot(self):
+        with self.lock:
+            return {name: {label: {'count': h.count, 'sum': h.sum, 'p50': h.quantile(0.5), 'p99': h.quantile(0.99)}
+                           for label, h in histograms.items()}
+                    for name, histograms in self.histograms.items()}
+
+    def prometheus_text(self):
+        lines = list()
+        with self.lock:
+            for name, histograms in self.histograms.items():
+                lines.append(f'# TYPE cexamm_{name} histogram')
+                for label, h in histograms.items():
+                    tag = '' if LABELS[name] is None else f'{LABELS[name]}="{label}",'
+                    seen = 0
+                    for bound, count in zip(BUCKETS + (float('inf'),), h.counts):
+                        seen += count
+                        le = '+Inf' if bound == float('inf') else repr(bound)
+                        lines.append(f'cexamm_{name}_bucket{{{tag}le="{le}"}} {seen}')
+                    tag = '' if LABELS[name] is None else f'{{{LABELS[name]}="{label}"}}'
+                    lines.append(f'cexamm_{name}_sum{tag} {h.sum}')
+                    lines.append(f'cexamm_{name}_count{tag} {h.count}')
+        return '\n'.join(lines) + '\n'
+
+    def write_jsonl(self, path, interval=60.0):
+        """
+        Append a snapshot to path every interval seconds from a daemon thread
+        """
+        def loop():
+            while True:
+                time.sleep(interval)
+                with open(path, 'a') as f:
+                    f.write(json.dumps({'time': time.time(), 'metrics': self.snapshot()}) + '\n')
+
+        thread = threading.Thread(target=loop, daemon=True)
+        thread.start()
+        return thread
+
+    def serve_prometheus(self, port=9108, host='127.0.0.1'):
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.prometheus_text().encode('UTF8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+METRICS = Metrics()
+
+
+def timed(phase):
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not METRICS.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                METRICS.observe('phase_seconds', phase, time.perf_counter() - start)
+        return wrapper
+    return decorator
@@ -2,18 +2,41 @@ import os
 import hmac
 import time
 import hashlib
-import requests
+import functools
 from retrying import retry
 from datetime import datetime
+from requests.exceptions import ConnectTimeout
+
+from cex_broker import Broker_Cache
+from cex_executor import Order_Executor
+from cex_logging import LOGGER
+from cex_metrics import METRICS
+from cex_ratelimit import Rate_Limited
+from cex_transport import HBTC_Transport
+
+# bounded exponential backoff with jitter, in milliseconds
+RETRY_KWARGS = {
+    'stop_max_attempt_number': 5,
+    'wait_exponential_multiplier': 100,
+    'wait_exponential_max': 2000,
+    'wait_jitter_max': 100,
+}
 
 
 def retry_if_not_interrupt(exception):
     return not isinstance(exception, KeyboardInterrupt)
 
 
+def retry_if_not_sent(exception):
+    # a POST that may have reached the exchange could have placed the order, resending would duplicate it
+    return isinstance(exception, (ConnectTimeout, Rate_Limited))
+
+
 class AMM_Model(object):
 
-    def __init__(self, api_key, secret_key) -> None:
+    def __init__(self, api_key, secret_key, pool_size=10, timeouts=None, order_concurrency=1,
+                 broker_ttl=3600, broker_snapshot=None, transport=None, broker=None, limiter=None,
+                 logger=None) -> None:
         super().__init__()
 
         # account Information
@@ -41,30 +64,63 @@ class AMM_Model(object):
             'withdrawalOrders': os.path.join(host, 'v1/withdrawalOrders'),
         }
 
-        # print parameters
-        self.self.text_colors = {
-            'logs': '\033[34m',  # 033 is the escape code and 34 is the color code
-            'info': '\033[32m',
-            'warning': '\033[33m',
-            'error': '\033[31m',
-            'bold': '\033[1m',
-            'end_color': '\033[0m'
+        # transport: (connect, read) timeout in seconds per endpoint
+        self.timeouts = {
+            'account': (3.05, 5),
+            'brokerInfo': (3.05, 15),
+            'bookTicker': (3.05, 3),
+            'depth': (3.05, 3),
+            'historyOrders': (3.05, 10),
+            'order': (3.05, 3),
+            'openOrders': (3.05, 5),
+            'price': (3.05, 3),
+            'withdrawalOrders': (3.05, 10),
         }
-
-    @retry(retry_on_exception=retry_if_not_interrupt)
+        self.timeouts.update(timeouts or {})
+        if transport is None:
+            transport = HBTC_Transport(pool_size=pool_size,
+                                       timeouts={self.urls[key]: value for key, value in self.timeouts.items()},
+                                       limiter=limiter)
+        self.transport = transport
+        self.clock, self.sleep = self.transport.clock, self.transport.sleep
+        if self.transport.simulated:
+            # a simulated exchange neither drops requests nor checks signatures, backtests skip the retry wrappers
+            self._hbtc_delete_func = functools.partial(self._request, 'DELETE')
+            self._hbtc_get_func = functools.partial(self._request, 'GET')
+            self._hbtc_post_func = functools.partial(self._request, 'POST')
+        # perf_counter at the start of the current strategy tick, for tick-to-ack latency
+        self.tick_started = None
+        self.executor = Order_Executor(self, concurrency=order_concurrency)
+        if broker is None:
+            broker = Broker_Cache(self._fetch_broker_info, ttl=broker_ttl, snapshot_path=broker_snapshot)
+        self.broker = broker
+
+        # queue-backed JSONL logger, shared by every model unless one is given
+        self.logger = LOGGER if logger is None else logger
+
+    def _request(self, method, url, headers={}, params={}):
+        if not METRICS.enabled:
+            return self.transport.request(method, url, headers=headers, params=params).json()
+        start = time.perf_counter()
+        try:
+            return self.transport.request(method, url, headers=headers, params=params).json()
+        finally:
+            METRICS.observe('request_seconds', f"{method} {url.split('/openapi/')[-1]}", time.perf_counter() - start)
+
+    @retry(retry_on_exception=retry_if_not_interrupt, **RETRY_KWARGS)
     def _hbtc_delete_func(self, url, headers={}, params={}):
-        req = requests.delete(url, headers=headers, params=params).json()
+        req = self._request('DELETE', url, headers, params)
         return req
 
-    @retry(retry_on_exception=retry_if_not_interrupt)
+    @retry(retry_on_exception=retry_if_not_interrupt, **RETRY_KWARGS)
     def _hbtc_get_func(self, url, headers={}, params={}):
-        req = requests.get(url, headers=headers, params=params).json()
+        req = self._request('GET', url, headers, params)
         return req
 
-    @retry(retry_on_exception=retry_if_not_interrupt)
+    @retry(retry_on_exception=retry_if_not_sent, **RETRY_KWARGS)
     def _hbtc_post_func(self, url, headers={}, params={}):
-        # avoid error code -1121
-        req = requests.post(url, headers=headers, params=params).json()
+        # avoid error code -1121; other failures go back to the caller, whose openOrders reconcile finds the order
+        req = self._request('POST', url, headers, params)
         return req
 
     def _get_signature_sha256(self, params: dict):
@@ -80,7 +136,7 @@ class AMM_Model(object):
 
     def _normalize_shares(self, shares: dict):
         sums = sum([item for item in shares.values()])
-        for key, value in sums:
+        for key, value in shares.items():
             shares[key] = value / sums
         return shares
 
@@ -103,19 +159,11 @@ class AMM_Model(object):
         else:
             raise ValueError('Wrong type of pair')
 
+    def _fetch_broker_info(self):
+        return self._hbtc_get_func(self.urls['brokerInfo'], params={'type': 'token'})
+
     def _query_broker(self, token_name):
-        symbol = dict()
-        token_name = token_name.upper()
-        for item in (self._hbtc_get_func(self.urls['brokerInfo'], params={'type': 'token'})['symbols']):
-            if item['symbol'] == token_name:
-                symbol['minPrice'] = float(item['filters'][0]['minPrice'])
-                symbol['maxPrice'] = float(item['filters'][0]['maxPrice'])
-                symbol['pricePrecision'] = len(item['filters'][0]['tickSize'].split('.')[1])
-                symbol['minQty'] = float(item['filters'][1]['minQty'])
-                symbol['maxQty'] = float(item['filters'][1]['maxQty'])
-                symbol['quantityPrecision'] = len(item['filters'][1]['stepSize'].split('.')[1])
-                break
-        return symbol
+        return dict(self.broker.get(token_name))
 
     def _check_token(self, token_name):
         token_names = [token_name] if isinstance(token_name, str) else token_name
@@ -123,32 +171,53 @@ class AMM_Model(object):
             assert len(self._query_broker(item)) != 0, f'Can\'t find {item}'
         return token_name
 
+    def _symbol_info(self, symbol):
+        # precision filters used to round orders of symbol, models trading several pairs override it
+        return self.symbol_info
+
     def _order_temp(self, symbol, side, price, quantity):
+        symbol_info = self._symbol_info(symbol)
         params = self._get_params({
             'side': side,
             'type': 'LIMIT',
             'symbol': symbol,
             'timeInForce': 'GTC',
-            'price': round(price, self.symbol_info['pricePrecision']),
-            'quantity': round(quantity, self.symbol_info['quantityPrecision']),
+            'price': round(price, symbol_info['pricePrecision']),
+            'quantity': round(quantity, symbol_info['quantityPrecision']),
         })
         req = self._hbtc_post_func(self.urls['order'], self.headers, params)
         return req
 
+    def _cancel_temp(self, order_id):
+        params = self._get_params({'orderId': order_id})
+        req = self._hbtc_delete_func(self.urls['order'], self.headers, params)
+        return req
+
     def _get_params(self, params={}):
+        # copy, the default dict is shared by every caller and thread
+        params = dict(params)
         params['timestamp'] = self.timestamp
-        params['signature'] = self._get_signature_sha256(params)
+        if not self.transport.simulated:
+            params['signature'] = self._get_signature_sha256(params)
         return params
 
     def _show_order(self, orders):
         for order in orders:
-            print(order)
+            self.logger.log('INFO', 'order', order=order)
 
-    def _make_order(self, orders):
+    def _show_failures(self, results):
+        for result in results:
+            if not result.ok:
+                self.print_warning_message('%s %s %s failed: %s', result.action, result.side, result.price,
+                                           result.response if result.error is None else result.error)
+
+    def _make_order(self, orders, cancels=()):
+        infos = list()
         while orders.qsize():
-            info = orders.get()
-            req = self._order_temp(symbol=info[0], side=info[1], price=info[2], quantity=info[3])
-            print(req)
+            infos.append(orders.get())
+        results = self.executor.execute(cancels=cancels, orders=infos)
+        self._show_failures(results)
+        return results
 
     def _get_steps(self, num, step) -> list:
         """
@@ -166,11 +235,11 @@ class AMM_Model(object):
 
     @property
     def timestamp(self):
-        return str(int(time.time() * 1000))  # millisecond -> microsecond
+        return str(int(self.clock() * 1000))  # millisecond -> microsecond
 
     @property
     def now(self):
-        return datetime.now().strftime('%H%M%S')
+        return datetime.fromtimestamp(self.clock()).strftime('%H%M%S')
 
     def query_history_order(self):
         orders = self._hbtc_get_func(self.urls['historyOrders'], self.headers, self._get_params())
@@ -185,34 +254,22 @@ class AMM_Model(object):
         return orders
 
     def delete_orders(self, orders):
-        for order in orders:
-            params = {'orderId': order['orderId']}
-            req = self._hbtc_delete_func(self.urls['order'], self.headers, self._get_params(params))
-            print(req)
+        results = self.executor.execute(cancels=orders)
+        self._show_failures(results)
+        return results
 
     # -------------------- print functions --------------------
-    def _get_curr_time_stamp(self):
-        return time.strftime("%Y-%m-%d %H:%M:%S")
-
-    def print_error_message(self, message):
-        time_stamp = self._get_curr_time_stamp()
-        error_str = self.self.text_colors['error'] + self.self.text_colors['bold'] + 'ERROR  ' + self.self.text_colors[
-            'end_color']
-        print('{} - {} - {}'.format(time_stamp, error_str, message))
-        print('{} - {} - {}'.format(time_stamp, error_str, 'Exiting!!!'))
+    def print_error_message(self, message, *args, **fields):
+        self.logger.log('ERROR', message, *args, **fields)
+        self.logger.log('ERROR', 'Exiting!!!')
+        self.logger.flush()
         exit(-1)
 
-    def print_log_message(self, message):
-        time_stamp = self._get_curr_time_stamp()
-        log_str = self.text_colors['logs'] + self.text_colors['bold'] + 'LOGS   ' + self.text_colors['end_color']
-        print('{} - {} - {}'.format(time_stamp, log_str, message))
+    def print_log_message(self, message, *args, **fields):
+        self.logger.log('LOGS', message, *args, **fields)
 
-    def print_warning_message(self, message):
-        time_stamp = self._get_curr_time_stamp()
-        warn_str = self.text_colors['warning'] + self.text_colors['bold'] + 'WARNING' + self.text_colors['end_color']
-        print('{} - {} - {}'.format(time_stamp, warn_str, message))
+    def print_warning_message(self, message, *args, **fields):
+        self.logger.log('WARNING', message, *args, **fields)
 
-    def print_info_message(self, message):
-        time_stamp = self._get_curr_time_stamp()
-        info_str = self.text_colors['info'] + self.text_colors['bold'] + 'INFO   ' + self.text_colors['end_color']
-        print('{} - {} - {}'.format(time_stamp, info_str, message))
+    def print_info_message(self, message, *args, **fields):
+        self.logger.log('INFO', message, *args, **fields)
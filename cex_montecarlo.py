@@ -0,0 +1,225 @@
+import os
+import sys
+import time
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# paths shared by every worker process, set once by _init_worker
+_PATHS = None
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def gbm_paths(n_paths, n_steps, s0=1.0, sigma=0.002, mu=0.0, seed=None):
+    """
+    Geometric Brownian motion, one row per path
+    :param sigma: volatility per step
+    """
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(mu - 0.5 * sigma ** 2, sigma, size=(n_paths, n_steps - 1))
+    log_paths = np.concatenate([np.zeros((n_paths, 1)), np.cumsum(returns, axis=1)], axis=1)
+    return s0 * np.exp(log_paths)
+
+
+def window_paths(prices, n_paths, n_steps, s0=None, seed=None):
+    """
+    Random windows of a historical price series, e.g. Market_Data_Reader.prices or load_ticks mids,
+    rescaled to start at s0 (the first price by default)
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    assert len(prices) >= n_steps, f'Need at least {n_steps} prices, got {len(prices)}'
+    s0 = prices[0] if s0 is None else s0
+    starts = np.random.default_rng(seed).integers(0, len(prices) - n_steps + 1, size=n_paths)
+    windows = prices[starts[:, None] + np.arange(n_steps)]
+    return windows * (s0 / windows[:, :1])
+
+
+def simulate(paths, shares, balances, second_step, second_order_depth=5, balance_ratio_condition=0.20,
+             first_step=0.005, second_total_orders_threshold=100, fee_rate=0.0):
+    """
+    Bivar's two regimes over every path at once, one vector step per price:
+    condition 1 rebalances one first_step chunk towards ratio_ab at the current price,
+    condition 2 runs the Grid_Ladder (price bp * (1 + step) ** j, quantity |(1 + step) ** j - 1| * bq / (1 + ratio_ab))
+    with at most second_order_depth levels filled per side between steps.
+    :param paths: (n_paths, n_steps) prices
+    :param shares: {symbol_name: a, 'USDT': b}
+    :param balances: {symbol_name: quantity, 'USDT': quantity}
+    :return: dict of per-path arrays
+    """
+    paths = np.asarray(paths, dtype=np.float64)
+    n_paths, n_steps = paths.shape
+    symbol_name = [key for key in shares if key != 'USDT'][0]
+    ratio_ab = shares[symbol_name] / shares['USDT']
+    depth = int(second_order_depth)
+
+    q = np.full(n_paths, float(balances[symbol_name]))
+    u = np.full(n_paths, float(balances['USDT']))
+    start_q, start_u, start_price = q.copy(), u.copy(), paths[:, 0].copy()
+
+    # level j relative to the base: growth G, quantity factor A and their prefix sums
+    log_g = np.log1p(second_step)
+    band = int(np.ceil(np.log(paths.max() / paths.min()) / log_g)) + depth + 2
+    growth = np.power(1 + second_step, np.arange(-band, band + 1, dtype=np.float64))
+    factor = np.abs(growth - 1) / (1 + ratio_ab)
+    cum_qty = np.concatenate([[0.0], np.cumsum(factor)])
+    cum_notional = np.concatenate([[0.0], np.cumsum(growth * factor)])
+
+    base_price, base_qty = start_price.copy(), q.copy()
+    center = np.zeros(n_paths, dtype=np.int64)
+    total_orders = np.zeros(n_paths, dtype=np.int64)
+    grid = np.zeros(n_paths, dtype=bool)
+    fills = np.zeros(n_paths, dtype=np.int64)
+    rebalances = np.zeros(n_paths, dtype=np.int64)
+    max_drift = np.zeros(n_paths)
+    eps = 1e-9
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for t in range(n_steps):
+            price = paths[:, t]
+
+            # fills of the resting ladder, sells up to the highest level crossed, buys down to the lowest
+            level = np.log(price / base_price) / log_g
+            up = np.where(grid, np.minimum(np.floor(level + eps).astype(np.int64), center + depth), center)
+            down = np.where(grid, np.maximum(np.ceil(level - eps).astype(np.int64), center - depth), center)
+            sells, buys = up > center, down < center
+
+            sell_qty = base_qty * (cum_qty[up + band + 1] - cum_qty[center + band + 1])
+            sell_notional = base_price * base_qty * (cum_notional[up + band + 1] - cum_notional[center + band + 1])
+            scale = np.where(sell_qty > q, q / sell_qty, 1.0)
+            sell_qty, sell_notional = np.where(sells, sell_qty * scale, 0.0), np.where(sells, sell_notional * scale, 0.0)
+
+            buy_qty = base_qty * (cum_qty[center + band] - cum_qty[down + band])
+            buy_notional = base_price * base_qty * (cum_notional[center + band] - cum_notional[down + band])
+            scale = np.where(buy_notional * (1 + fee_rate) > u, u / (buy_notional * (1 + fee_rate)), 1.0)
+            buy_qty, buy_notional = np.where(buys, buy_qty * scale, 0.0), np.where(buys, buy_notional * scale, 0.0)
+
+            q += buy_qty - sell_qty
+            u += sell_notional - buy_notional - (sell_notional + buy_notional) * fee_rate
+            crossed = np.where(sells, up - center, 0) + np.where(buys, center - down, 0)
+            fills += crossed
+            # the window re-centres on the outermost fill, every filled level is replaced by a new pair
+            center = np.where(sells, up, np.where(buys, down, center))
+            total_orders += 2 * crossed
+
+            ratio = price * q / u
+            drift = np.abs(ratio_ab - ratio)
+            max_drift = np.maximum(max_drift, np.nan_to_num(drift, nan=0.0, posinf=0.0))
+
+            # condition 1: cancel the ladder and trade one chunk of delta_qty at the book price
+            off = drift >= balance_ratio_condition
+            if off.any():
+                delta_qty = np.abs((ratio_ab * u - price * q) / (price * (1 + ratio_ab)))
+                notional = np.minimum(price * delta_qty, (price * q + u) * first_step)
+                buy = off & (ratio < ratio_ab)
+                sell = off & ~buy
+                notional = np.where(buy, np.minimum(notional, u / (1 + fee_rate)), notional)
+                notional = np.where(sell, np.minimum(notional, q * price), notional)
+                notional = np.where(off, np.nan_to_num(notional, nan=0.0), 0.0)
+                q += np.where(buy, notional, -notional) / price
+                u += np.where(buy, -notional, notional) - notional * fee_rate
+                rebalances += off
+                grid &= ~off
+
+            # condition 2: a fresh base when the ladder was dropped or has placed too many orders
+            reset = ~off & (~grid | (total_orders >= second_total_orders_threshold))
+            base_price = np.where(reset, price, base_price)
+            base_qty = np.where(reset, q, base_qty)
+            center = np.where(reset, 0, center)
+            total_orders = np.where(reset, 2 * depth, total_orders)
+            grid |= reset
+
+    end_price = paths[:, -1]
+    equity = q * end_price + u
+    start_equity = start_q * start_price + start_u
+    return {
+        'pnl': equity - start_equity,
+        'pnl_vs_hold': equity - (start_q * end_price + start_u),
+        'return': equity / start_equity - 1,
+        'inventory': q,
+        'usdt': u,
+        'ratio': q * end_price / u,
+        'max_drift': max_drift,
+        'fills': fills,
+        'rebalances': rebalances,
+    }
+
+
+def summarize(results):
+    """
+    :return: {key: {'mean', 'std', 'p5', ..., 'p95'}} over paths
+    """
+    summary = dict()
+    for key, values in results.items():
+        values = np.asarray(values, dtype=np.float64)
+        stats = {'mean': float(np.mean(values)), 'std': float(np.std(values))}
+        for q, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+            stats[f'p{q}'] = float(value)
+        summary[key] = stats
+    return summary
+
+
+def _init_worker(paths):
+    global _PATHS
+    _PATHS = paths
+
+
+def _evaluate(args):
+    kwargs, params = args
+    return simulate(_PATHS, **kwargs, **params)
+
+
+class Monte_Carlo_Sweep(object):
+
+    def __init__(self, paths, shares, balances,
+                 first_step=0.005, second_total_orders_threshold=100, fee_rate=0.0,
+                 workers=None) -> None:
+        super().__init__()
+
+        self.paths = np.ascontiguousarray(paths, dtype=np.float64)
+        self.kwargs = {'shares': dict(shares), 'balances': dict(balances), 'first_step': first_step,
+                       'second_total_orders_threshold': second_total_orders_threshold, 'fee_rate': fee_rate}
+        self.workers = workers or os.cpu_count()
+
+    def run(self, grid):
+        """
+        Evaluate every combination of the grid over all paths, one combination per worker task
+        :param grid: {'second_step': [...], 'second_order_depth': [...], 'balance_ratio_condition': [...]}
+        :return: list of (params, results, summary), in grid order
+        """
+        keys = list(grid)
+        combos = [dict(zip(keys, values)) for values in itertools.product(*[grid[key] for key in keys])]
+        tasks = [(self.kwargs, params) for params in combos]
+        if self.workers <= 1 or len(combos) == 1:
+            _init_worker(self.paths)
+            outputs = [_evaluate(task) for task in tasks]
+        else:
+            # paths are sent once per worker, not once per task
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                     initargs=(self.paths,)) as pool:
+                outputs = list(pool.map(_evaluate, tasks))
+        return [(params, results, summarize(results)) for params, results in zip(combos, outputs)]
+
+    @staticmethod
+    def best(sweep, key='pnl', stat='p50'):
+        return max(sweep, key=lambda item: item[2][key][stat])
+
+
+if __name__ == '__main__':
+    # python cex_montecarlo.py [n_paths] [n_steps]
+    n_paths = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    n_steps = int(sys.argv[2]) if len(sys.argv) > 2 else 1440
+    grid = {
+        'second_step': [0.005, 0.01, 0.02],
+        'second_order_depth': [3, 5, 8],
+        'balance_ratio_condition': [0.1, 0.2, 0.3],
+    }
+    wall = time.time()
+    sweep = Monte_Carlo_Sweep(gbm_paths(n_paths, n_steps, s0=0.1, sigma=0.003, seed=0),
+                              shares={'GRIN': 7, 'USDT': 3}, balances={'GRIN': 10000, 'USDT': 428.6},
+                              fee_rate=0.001).run(grid)
+    for params, _, summary in sweep:
+        print(params, {key: round(summary['pnl'][key], 4) for key in ('mean', 'p5', 'p50', 'p95')},
+              'inventory p50:', round(summary['inventory']['p50'], 2))
+    print('best:', Monte_Carlo_Sweep.best(sweep)[0], f'{len(sweep)} combinations in {time.time() - wall:.2f}s')
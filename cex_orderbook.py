@@ -0,0 +1,219 @@
+import json
+import time
+import threading
+from bisect import bisect_left, insort
+
+from cex_logging import LOGGER
+
+
+class Order_Book(object):
+
+    def __init__(self, symbol) -> None:
+        super().__init__()
+
+        self.symbol = symbol.upper()
+        # price -> quantity, plus ascending price lists for O(1) best levels
+        self.bids, self.asks = dict(), dict()
+        self.bid_prices, self.ask_prices = list(), list()
+        self.seq = None
+        self.synced = False
+        self.gaps = 0
+        # the stream thread writes while the strategy thread reads
+        self.lock = threading.Lock()
+
+    def _set_level(self, levels, prices, price, quantity):
+        price, quantity = float(price), float(quantity)
+        if quantity == 0.0:
+            if levels.pop(price, None) is not None:
+                del prices[bisect_left(prices, price)]
+        else:
+            if price not in levels:
+                insort(prices, price)
+            levels[price] = quantity
+
+    def apply_snapshot(self, bids, asks, seq=None):
+        with self.lock:
+            self.bids, self.asks = dict(), dict()
+            self.bid_prices, self.ask_prices = list(), list()
+            for price, quantity in bids:
+                self._set_level(self.bids, self.bid_prices, price, quantity)
+            for price, quantity in asks:
+                self._set_level(self.asks, self.ask_prices, price, quantity)
+            # without a sequence number the next diff becomes the baseline
+            self.seq = seq
+            # a one-sided book has no best bid/ask to trade from
+            self.synced = bool(self.bid_prices) and bool(self.ask_prices)
+
+    def apply_diff(self, bids, asks, seq):
+        """
+        Apply an incremental update, a zero quantity removes the level
+        :return: False if a sequence gap was detected and the book needs a resync
+        """
+        with self.lock:
+            if not self.synced:
+                return False
+            if self.seq is not None and seq != self.seq + 1:
+                self.synced = False
+                self.gaps += 1
+                return False
+            for price, quantity in bids:
+                self._set_level(self.bids, self.bid_prices, price, quantity)
+            for price, quantity in asks:
+                self._set_level(self.asks, self.ask_prices, price, quantity)
+            self.seq = seq
+            if not self.bid_prices or not self.ask_prices:
+                self.synced = False
+                return False
+            return True
+
+    def invalidate(self):
+        # readers fall back to REST depth until the next snapshot
+        with self.lock:
+            self.synced = False
+
+    @property
+    def best_bid(self):
+        # None when the side is empty
+        with self.lock:
+            if not self.bid_prices:
+                return None
+            price = self.bid_prices[-1]
+            return price, self.bids[price]
+
+    @property
+    def best_ask(self):
+        with self.lock:
+            if not self.ask_prices:
+                return None
+            price = self.ask_prices[0]
+            return price, self.asks[price]
+
+    def best(self, side):
+        return self.best_bid if side == 'BUY' else self.best_ask
+
+    @property
+    def mid(self):
+        bid, ask = self.best_bid, self.best_ask
+        if bid is None or ask is None:
+            return None
+        return (bid[0] + ask[0]) * 0.5
+
+    def queue_position(self, side, price):
+        """
+        Quantity resting at a price level, i.e. the queue ahead of a new order there
+        """
+        levels = self.bids if side == 'BUY' else self.asks
+        with self.lock:
+            return levels.get(float(price), 0.0)
+
+    def top(self, n=5):
+        # same shape as the quote/v1/depth response
+        with self.lock:
+            return {
+                'bids': [[price, self.bids[price]] for price in self.bid_prices[::-1][:n]],
+                'asks': [[price, self.asks[price]] for price in self.ask_prices[:n]],
+            }
+
+
+class Replay_Feed(object):
+    """
+    Offline stand-in for the depth stream, one JSON message per line:
+    {"type": "snapshot" | "diff" | "trade", "seq": int, "bids": [[p, q]], "asks": [[p, q]]}
+    """
+
+    def __init__(self, path) -> None:
+        super().__init__()
+        self.path = path
+
+    def __iter__(self):
+        with open(self.path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+class Depth_Stream(object):
+
+    def __init__(self, book, feed, snapshot_func=None, on_trade=None,
+                 retry_interval=1.0, max_retries=5, logger=None) -> None:
+        super().__init__()
+
+        self.book = book
+        # feed: any iterable of messages, e.g. Replay_Feed or a websocket client; it is iterated
+        # again after an error, so a reconnecting client resumes
+        self.feed = feed
+        # snapshot_func() -> depth dict with optional 'seq', used to resync after a gap
+        self.snapshot_func = snapshot_func
+        self.on_trade = on_trade
+        # consecutive feed errors before the stream gives up, the book stays invalid then
+        self.retry_interval = retry_interval
+        self.max_retries = max_retries
+        self.logger = LOGGER if logger is None else logger
+
+        self.thread = None
+        self.running = False
+        self.messages = 0
+        self.errors = 0
+        self.resynced = -float('inf')
+
+    def resync(self):
+        if self.snapshot_func is None:
+            return
+        # at most one REST depth per retry_interval while a resync keeps failing
+        if time.monotonic() - self.resynced < self.retry_interval:
+            return
+        self.resynced = time.monotonic()
+        try:
+            depth = self.snapshot_func()
+            self.book.apply_snapshot(depth['bids'], depth['asks'], depth.get('seq'))
+        except Exception as e:
+            self.book.invalidate()
+            self.logger.log('WARNING', '%s depth resync failed: %s', self.book.symbol, e)
+
+    def handle(self, message):
+        self.messages += 1
+        if message['type'] == 'snapshot':
+            self.book.apply_snapshot(message['bids'], message['asks'], message.get('seq'))
+        elif message['type'] == 'diff':
+            if not self.book.apply_diff(message.get('bids', []), message.get('asks', []), message['seq']):
+                self.resync()
+        elif message['type'] == 'trade' and self.on_trade is not None:
+            self.on_trade(message)
+
+    def _consume(self):
+        for message in self.feed:
+            if not self.running:
+                return
+            self.handle(message)
+            self.errors = 0
+
+    def run(self):
+        self.running = True
+        try:
+            while self.running:
+                try:
+                    self._consume()
+                    return
+                except Exception as e:
+                    self.errors += 1
+                    self.book.invalidate()
+                    self.logger.log('WARNING', '%s depth stream error %s/%s: %s', self.book.symbol, self.errors,
+                                    self.max_retries, e)
+                    if self.errors >= self.max_retries:
+                        return
+                    time.sleep(self.retry_interval)
+        finally:
+            # a finished or dead feed must not leave a frozen book behind
+            self.book.invalidate()
+            self.running = False
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
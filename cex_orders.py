@@ -0,0 +1,86 @@
+import time
+
+
+class Open_Order_Tracker(object):
+
+    def __init__(self, tick_size, on_fill=None, on_partial_fill=None, on_add=None, clock=time.time) -> None:
+        super().__init__()
+
+        self.tick_size = tick_size
+        # on_fill(order) is called for orders that left the book without being cancelled by us,
+        # on_partial_fill(order, quantity) when a live order's executedQty grew by quantity,
+        # on_add(order) for live orders first learned from openOrders
+        self.on_fill = on_fill
+        self.on_partial_fill = on_partial_fill
+        self.on_add = on_add
+        self.clock = clock
+
+        self.orders = dict()  # orderId -> order
+        self.ticks = dict()  # price tick -> {orderId: order}
+        self.reconciled = 0.0
+
+    def tick(self, price):
+        return int(round(float(price) / self.tick_size))
+
+    @staticmethod
+    def executed(order):
+        return float(order.get('executedQty') or 0)
+
+    def __len__(self):
+        return len(self.orders)
+
+    def values(self):
+        return list(self.orders.values())
+
+    def has(self, tick):
+        return tick in self.ticks
+
+    def at(self, tick):
+        return list(self.ticks.get(tick, dict()).values())
+
+    def add(self, order):
+        order_id = order['orderId']
+        tick = self.tick(order['price'])
+        self.orders[order_id] = order
+        self.ticks.setdefault(tick, dict())[order_id] = order
+
+    def remove(self, order_id):
+        order = self.orders.pop(order_id, None)
+        if order is None:
+            return None
+        tick = self.tick(order['price'])
+        level = self.ticks[tick]
+        del level[order_id]
+        if len(level) == 0:
+            del self.ticks[tick]
+        return order
+
+    def fill(self, order_id):
+        order = self.remove(order_id)
+        if order is not None and self.on_fill is not None:
+            self.on_fill(order)
+        return order
+
+    def reconcile(self, open_orders):
+        """
+        Align with the exchange openOrders list, tracked orders keep the last executedQty seen
+        :return: the tracked orders that are gone from the exchange, treated as filled
+        """
+        if not isinstance(open_orders, list):
+            return list()
+        live = {order['orderId']: order for order in open_orders}
+        filled = [self.fill(order_id) for order_id in list(self.orders.keys()) if order_id not in live]
+        for order_id, order in live.items():
+            known = self.orders.get(order_id)
+            if known is None:
+                self.add(order)
+                if self.on_add is not None:
+                    self.on_add(order)
+                continue
+            quantity = self.executed(order) - self.executed(known)
+            if quantity > 0:
+                known['executedQty'] = order['executedQty']
+                if self.on_partial_fill is not None:
+                    self.on_partial_fill(known, quantity)
+        self.reconciled = self.clock()
+        return filled
@@ -0,0 +1,121 @@
+import time
+
+EMPTY_BALANCE = {'total': '0', 'free': '0', 'locked': '0'}
+
+
+class Asset_Position(object):
+    __slots__ = ('asset', 'total', 'free', 'locked')
+
+    def __init__(self, asset, total=0.0, free=0.0, locked=0.0) -> None:
+        super().__init__()
+
+        self.asset = asset
+        self.total, self.free, self.locked = total, free, locked
+
+    def load(self, item):
+        self.total, self.free, self.locked = float(item['total']), float(item['free']), float(item['locked'])
+
+    def lock(self, quantity):
+        self.free -= quantity
+        self.locked += quantity
+
+    def spend(self, quantity):
+        # a filled order takes its quantity out of the locked part
+        self.total -= quantity
+        self.locked -= quantity
+
+    def receive(self, quantity):
+        self.total += quantity
+        self.free += quantity
+
+
+class Portfolio_Ledger(object):
+    __slots__ = ('symbol_name', 'base', 'quote', 'price', 'fee_rate', 'reconcile_interval', 'tolerance',
+                 'clock', 'reconciled', 'dirty', 'drift')
+
+    def __init__(self, symbol_name, fee_rate=0.0, reconcile_interval=60.0, tolerance=1e-3, clock=time.time) -> None:
+        super().__init__()
+
+        # the base asset and USDT, kept up to date from our own order events between account reconciles
+        self.symbol_name = symbol_name
+        self.base = Asset_Position(symbol_name)
+        self.quote = Asset_Position('USDT')
+        self.price = 0.0  # base price in USDT, marked from the snapshot
+        self.fee_rate = fee_rate
+
+        self.reconcile_interval = reconcile_interval
+        self.tolerance = tolerance  # relative drift that forces another reconcile
+        self.clock = clock
+        self.reconciled = -float('inf')
+        self.dirty = True
+        self.drift = 0.0
+
+    @property
+    def due(self):
+        return self.dirty or self.clock() - self.reconciled >= self.reconcile_interval
+
+    def reconcile(self, balances):
+        """
+        Reset both positions from the account endpoint
+        :param balances: the 'balances' list of v1/account
+        :return: the largest relative difference between the ledger and the account
+        """
+        expected = (self.base.total, self.quote.total)
+        items = {item['assetName']: item for item in balances}
+        self.base.load(items.get(self.symbol_name, EMPTY_BALANCE))
+        self.quote.load(items.get('USDT', EMPTY_BALANCE))
+
+        drift = 0.0
+        if self.reconciled != -float('inf'):
+            for before, after in zip(expected, (self.base.total, self.quote.total)):
+                drift = max(drift, abs(before - after) / max(abs(after), 1e-12))
+        self.drift = drift
+        # keep reconciling every step until the ledger agrees with the exchange again
+        self.dirty = drift > self.tolerance
+        self.reconciled = self.clock()
+        return drift
+
+    def invalidate(self):
+        self.dirty = True
+
+    def mark(self, price):
+        self.price = float(price)
+
+    def lock(self, side, price, quantity):
+        if side == 'BUY':
+            self.quote.lock(float(price) * float(quantity))
+        else:
+            self.base.lock(float(quantity))
+
+    def unlock(self, side, price, quantity):
+        self.lock(side, price, -float(quantity))
+
+    def fill(self, side, price, quantity):
+        """
+        A resting order left the book filled, the fee is charged on the received asset
+        """
+        price, quantity = float(price), float(quantity)
+        if side == 'BUY':
+            self.quote.spend(price * quantity)
+            self.base.receive(quantity * (1 - self.fee_rate))
+        else:
+            self.base.spend(quantity)
+            self.quote.receive(price * quantity * (1 - self.fee_rate))
+        if min(self.base.free, self.base.locked, self.quote.free, self.quote.locked) < -1e-9:
+            self.dirty = True
+
+    @property
+    def ratio(self):
+        return self.base.total * self.price / self.quote.total if self.quote.total else float('inf')
+
+    @property
+    def total_assets(self):
+        return self.base.total * self.price + self.quote.total
+
+    @property
+    def free_assets(self):
+        return self.base.free * self.price + self.quote.free
+
+    @property
+    def locked_assets(self):
+        return self.base.locked * self.price + self.quote.locked
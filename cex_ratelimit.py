@@ -0,0 +1,137 @@
+import time
+import threading
+import itertools
+
+
+class Rate_Limited(Exception):
+    pass
+
+
+# (method, path) -> (weight class, weight, priority), a lower priority goes first
+ROUTES = {
+    ('DELETE', 'v1/order'): ('order', 1, 0),
+    ('POST', 'v1/order'): ('order', 1, 1),
+    ('GET', 'v1/openOrders'): ('query', 1, 2),
+    ('GET', 'v1/account'): ('query', 5, 2),
+    ('GET', 'quote/v1/depth'): ('market', 1, 2),
+    ('GET', 'quote/v1/ticker/bookTicker'): ('market', 1, 2),
+    ('GET', 'quote/v1/ticker/price'): ('market', 1, 2),
+    ('GET', 'v1/brokerInfo'): ('market', 1, 2),
+    ('GET', 'v1/historyOrders'): ('query', 5, 3),
+    ('GET', 'v1/withdrawalOrders'): ('query', 5, 3),
+}
+
+# weight class -> (weight per second, burst)
+LIMITS = {
+    'order': (10.0, 20),
+    'query': (10.0, 20),
+    'market': (20.0, 40),
+    'total': (40.0, 80),  # every request also draws from this one
+}
+
+
+class Token_Bucket(object):
+
+    def __init__(self, rate, capacity) -> None:
+        super().__init__()
+
+        self.base_rate = self.rate = rate
+        self.capacity = capacity
+        self.tokens, self.updated = float(capacity), time.monotonic()
+        self.paused_until = 0.0
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def ready(self, now, weight):
+        return now >= self.paused_until and self.tokens >= weight
+
+    def wait_time(self, now, weight):
+        return max(self.paused_until - now, (weight - self.tokens) / self.rate, 0.0)
+
+    def throttle(self, now, pause, factor):
+        self.rate = max(self.base_rate * 0.1, self.rate * factor)
+        self.tokens = min(self.tokens, 0.0)
+        self.paused_until = max(self.paused_until, now + pause)
+
+    def recover(self):
+        self.rate = min(self.base_rate, self.rate + self.base_rate * 0.02)
+
+
+class Request_Scheduler(object):
+
+    def __init__(self, limits=None, routes=None, ban_pause=300.0, throttle_pause=1.0) -> None:
+        super().__init__()
+
+        limits = dict(LIMITS, **(limits or {}))
+        self.buckets = {name: Token_Bucket(rate, burst) for name, (rate, burst) in limits.items()}
+        self.routes = dict(ROUTES, **(routes or {}))
+        self.ban_pause, self.throttle_pause = ban_pause, throttle_pause
+
+        self.cond = threading.Condition()
+        self.waiters = list()  # [priority, seq, weight class, weight]
+        self.seq = itertools.count()
+        self.throttled, self.banned = 0, 0
+
+    def classify(self, method, url):
+        return self.routes.get((method, url.split('/openapi/')[-1]), ('query', 1, 2))
+
+    def _eligible(self, waiter, now):
+        _, _, name, weight = waiter
+        bucket, total = self.buckets[name], self.buckets['total']
+        if not bucket.ready(now, weight) or not total.ready(now, weight):
+            return False
+        # the shared total weight goes to the best waiter whose own class could proceed
+        for other in self.waiters:
+            if other[:2] < waiter[:2] and self.buckets[other[2]].ready(now, other[3]):
+                return False
+        return True
+
+    def acquire(self, method, url):
+        """
+        Block until the request may be sent, cancels before new orders before queries
+        :return: the weight class, to be passed back to feedback
+        """
+        name, weight, priority = self.classify(method, url)
+        waiter = [priority, next(self.seq), name, weight]
+        bucket, total = self.buckets[name], self.buckets['total']
+        with self.cond:
+            self.waiters.append(waiter)
+            while True:
+                now = time.monotonic()
+                for item in self.buckets.values():
+                    item.refill(now)
+                if self._eligible(waiter, now):
+                    break
+                self.cond.wait(max(0.001, min(bucket.wait_time(now, weight), total.wait_time(now, weight), 0.05)))
+            self.waiters.remove(waiter)
+            bucket.tokens -= weight
+            total.tokens -= weight
+            self.cond.notify_all()
+        return name
+
+    def feedback(self, name, status_code, headers={}):
+        """
+        Adapt to the exchange: 429 slows the class down, 418 (banned) stops every class
+        """
+        with self.cond:
+            now = time.monotonic()
+            if status_code == 429:
+                self.throttled += 1
+                pause = float(headers.get('Retry-After', self.throttle_pause))
+                self.buckets[name].throttle(now, pause, 0.5)
+                self.buckets['total'].throttle(now, pause, 0.8)
+            elif status_code == 418:
+                self.banned += 1
+                pause = float(headers.get('Retry-After', self.ban_pause))
+                for bucket in self.buckets.values():
+                    bucket.throttle(now, pause, 0.5)
+            elif status_code < 400:
+                self.buckets[name].recover()
+                self.buckets['total'].recover()
+
+    @property
+    def stats(self):
+        return {'throttled': self.throttled, 'banned': self.banned,
+                'rates': {name: round(bucket.rate, 3) for name, bucket in self.buckets.items()}}
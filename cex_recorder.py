@@ -0,0 +1,204 @@
+import os
+import json
+import glob
+
+import numpy as np
+
+
+# price ticks overflow int32 for high priced pairs with fine ticks, e.g. 100000 at 1e-5
+PRICE_DTYPE = '<i8'
+
+
+def book_dtype(depth, price_dtype=PRICE_DTYPE):
+    # prices as int64 ticks, quantities as int64 lots, time in milliseconds
+    return np.dtype([('time', '<i8'),
+                     ('bid_px', price_dtype, (depth,)), ('bid_qty', '<i8', (depth,)),
+                     ('ask_px', price_dtype, (depth,)), ('ask_qty', '<i8', (depth,))])
+
+
+def trade_dtype(price_dtype=PRICE_DTYPE):
+    return np.dtype([('time', '<i8'), ('price', price_dtype), ('qty', '<i8'), ('side', 'i1')])
+
+
+TRADE_DTYPE = trade_dtype()
+
+
+class _Column_Writer(object):
+
+    def __init__(self, directory, prefix, kind, dtype, rows_per_file, chunk_rows) -> None:
+        super().__init__()
+
+        self.directory, self.prefix, self.kind = directory, prefix, kind
+        self.dtype = dtype
+        self.rows_per_file = rows_per_file
+
+        self.buffer = np.zeros(chunk_rows, dtype=dtype)
+        self.size = 0
+        self.file, self.file_rows = None, 0
+        self.index = len(glob.glob(self._path('*')))
+
+    def _path(self, index):
+        index = index if isinstance(index, str) else f'{index:05d}'
+        return os.path.join(self.directory, f'{self.prefix}.{self.kind}.{index}.bin')
+
+    def row(self):
+        # the next free row of the chunk buffer, flushed when full; it only counts once commit is called,
+        # so a write that fails half way is overwritten by the next row instead of landing in the file
+        if self.size == len(self.buffer):
+            self.flush()
+        row = self.buffer[self.size]
+        row.fill(0)
+        return row
+
+    def commit(self):
+        self.size += 1
+
+    def flush(self):
+        start = 0
+        while start < self.size:
+            if self.file is None or self.file_rows >= self.rows_per_file:
+                self._rotate()
+            count = min(self.size - start, self.rows_per_file - self.file_rows)
+            self.file.write(self.buffer[start:start + count].tobytes())
+            self.file_rows += count
+            start += count
+        if self.file is not None:
+            self.file.flush()
+        self.buffer[:self.size] = 0
+        self.size = 0
+
+    def _rotate(self):
+        if self.file is not None:
+            self.file.close()
+        self.file, self.file_rows = open(self._path(self.index), 'ab'), 0
+        self.index += 1
+
+    def close(self):
+        self.flush()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class Market_Data_Recorder(object):
+
+    def __init__(self, directory, symbol, tick_size, step_size, depth=5,
+                 rows_per_file=1_000_000, chunk_rows=1024) -> None:
+        super().__init__()
+
+        self.directory = directory
+        self.symbol = symbol.upper()
+        self.tick_size, self.step_size = float(tick_size), float(step_size)
+        self.depth = depth
+        os.makedirs(directory, exist_ok=True)
+
+        with open(os.path.join(directory, f'{self.symbol}.meta.json'), 'w') as f:
+            json.dump({'symbol': self.symbol, 'depth': depth, 'tickSize': self.tick_size,
+                       'stepSize': self.step_size, 'priceDtype': PRICE_DTYPE}, f)
+        self.books = _Column_Writer(directory, self.symbol, 'book', book_dtype(depth), rows_per_file, chunk_rows)
+        self.trades = _Column_Writer(directory, self.symbol, 'trade', TRADE_DTYPE, rows_per_file, chunk_rows)
+
+    def _levels(self, levels):
+        levels = levels[:self.depth]
+        prices = [round(float(price) / self.tick_size) for price, _ in levels]
+        quantities = [round(float(quantity) / self.step_size) for _, quantity in levels]
+        return len(levels), prices, quantities
+
+    def record_depth(self, depth):
+        """
+        :param depth: quote/v1/depth response, missing levels are stored as zeros
+        """
+        row = self.books.row()
+        row['time'] = depth.get('time', 0)
+        for side, levels in (('bid', depth['bids']), ('ask', depth['asks'])):
+            n, prices, quantities = self._levels(levels)
+            row[f'{side}_px'][:n] = prices
+            row[f'{side}_qty'][:n] = quantities
+        self.books.commit()
+
+    def record_ticker(self, time_ms, book_ticker):
+        self.record_depth({'time': time_ms,
+                           'bids': [[book_ticker['bidPrice'], book_ticker.get('bidQty', 0)]],
+                           'asks': [[book_ticker['askPrice'], book_ticker.get('askQty', 0)]]})
+
+    def record_trade(self, time_ms, price, quantity, side):
+        row = self.trades.row()
+        row['time'] = time_ms
+        row['price'] = round(float(price) / self.tick_size)
+        row['qty'] = round(float(quantity) / self.step_size)
+        row['side'] = 1 if side == 'BUY' else -1
+        self.trades.commit()
+
+    def on_trade(self, message):
+        # Depth_Stream trade messages: {"time", "price", "qty", "side"}
+        self.record_trade(message['time'], message['price'], message['qty'], message['side'])
+
+    def flush(self):
+        self.books.flush()
+        self.trades.flush()
+
+    def close(self):
+        self.books.close()
+        self.trades.close()
+
+
+class Market_Data_Reader(object):
+
+    def __init__(self, directory, symbol) -> None:
+        super().__init__()
+
+        self.directory = directory
+        self.symbol = symbol.upper()
+        with open(os.path.join(directory, f'{self.symbol}.meta.json'), 'r') as f:
+            self.meta = json.load(f)
+        self.tick_size, self.step_size = self.meta['tickSize'], self.meta['stepSize']
+        # recordings made before priceDtype was stored hold int32 price ticks
+        price_dtype = self.meta.get('priceDtype', '<i4')
+        self.book_dtype = book_dtype(self.meta['depth'], price_dtype)
+        self.trade_dtype = trade_dtype(price_dtype)
+
+    def _chunks(self, kind, dtype):
+        chunks = list()
+        for path in sorted(glob.glob(os.path.join(self.directory, f'{self.symbol}.{kind}.*.bin'))):
+            # ignore a torn trailing row left by a crash
+            rows = os.path.getsize(path) // dtype.itemsize
+            if rows:
+                chunks.append(np.memmap(path, dtype=dtype, mode='r', shape=(rows,)))
+        return chunks
+
+    def book_chunks(self):
+        """
+        Zero-copy views, one per file
+        """
+        return self._chunks('book', self.book_dtype)
+
+    def trade_chunks(self):
+        return self._chunks('trade', self.trade_dtype)
+
+    def books(self):
+        chunks = self.book_chunks()
+        if len(chunks) == 0:
+            return np.zeros(0, dtype=self.book_dtype)
+        return chunks[0] if len(chunks) == 1 else np.concatenate(chunks)
+
+    def trades(self):
+        chunks = self.trade_chunks()
+        if len(chunks) == 0:
+            return np.zeros(0, dtype=self.trade_dtype)
+        return chunks[0] if len(chunks) == 1 else np.concatenate(chunks)
+
+    def prices(self, ticks):
+        return ticks * self.tick_size
+
+    def quantities(self, lots):
+        return lots * self.step_size
+
+    def ticks(self):
+        """
+        Top of book rows as (time in seconds, bid, ask, bid_qty, ask_qty), the Backtest input
+        """
+        for chunk in self.book_chunks():
+            times = chunk['time'] / 1000.0
+            bids, asks = self.prices(chunk['bid_px'][:, 0]), self.prices(chunk['ask_px'][:, 0])
+            bid_qtys, ask_qtys = self.quantities(chunk['bid_qty'][:, 0]), self.quantities(chunk['ask_qty'][:, 0])
+            yield from zip(times.tolist(), bids.tolist(), asks.tolist(), bid_qtys.tolist(), ask_qtys.tolist())
@@ -0,0 +1,111 @@
+import sys
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from cex_bivar import Bivar
+from cex_model import AMM_Model
+from cex_ratelimit import Request_Scheduler
+from cex_scheduler import Event_Scheduler
+from cex_snapshot import Market_Data_Cache
+from cex_transport import HBTC_Transport
+
+
+class Strategy_Slot(object):
+
+    def __init__(self, config) -> None:
+        super().__init__()
+
+        # config: Bivar keyword arguments plus balance_ratio_condition and second_total_orders_threshold
+        self.config = dict(config)
+        self.balance_ratio_condition = self.config.pop('balance_ratio_condition', 0.20)
+        self.second_total_orders_threshold = self.config.pop('second_total_orders_threshold', 100)
+        self.name = self.config.get('symbol_name', 'GRIN')
+        # optional depth message iterable or Replay_Feed path, see Bivar.stream_order_book
+        self.depth_feed = self.config.pop('depth_feed', None)
+        self.stream = None
+
+        self.bivar = None
+        self.orders = list()
+        self.errors = 0
+        self.skip = 0  # steps to sit out after a failure
+        self.last_error = None
+
+
+class Multi_Runner(object):
+
+    def __init__(self, api_key, secret_key, configs,
+                 workers=8, pool_size=32, limits=None,
+                 broker_snapshot=None, price_ttl=0.5, max_backoff=60) -> None:
+        super().__init__()
+
+        self.api_key, self.secret_key = api_key, secret_key
+        # one transport, one rate limiter, one broker list and one price cache for every symbol
+        self.limiter = Request_Scheduler(limits=limits)
+        self.transport = HBTC_Transport(pool_size=pool_size, limiter=self.limiter)
+        self.client = AMM_Model(api_key, secret_key, transport=self.transport, broker_snapshot=broker_snapshot)
+        self.market_cache = Market_Data_Cache(self.client, ttl=price_ttl)
+
+        self.slots = [Strategy_Slot(config) for config in configs]
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.max_backoff = max_backoff
+        self.scheduler = Event_Scheduler(clock=self.transport.clock)
+
+    def _build(self, slot):
+        slot.bivar = Bivar(self.api_key, self.secret_key, transport=self.transport, broker=self.client.broker,
+                           market_cache=self.market_cache, **slot.config)
+        # a rebuilt strategy keeps the running stream of the slot
+        if slot.depth_feed is not None and slot.stream is None:
+            slot.stream = slot.bivar.stream_order_book(slot.depth_feed)
+        elif slot.stream is not None:
+            slot.bivar.attach_order_book(slot.stream.book)
+        slot.orders = slot.bivar.refresh_tick()
+        if not slot.bivar.resumed and abs(slot.bivar.ratio_ab - slot.bivar.ratio) < slot.balance_ratio_condition:
+            slot.bivar.delete_orders(slot.orders)
+
+    def _step(self, slot, restart=False):
+        if slot.skip > 0:
+            slot.skip -= 1
+            return
+        # isolate every symbol: print_error_message exits, so SystemExit is caught too
+        try:
+            if slot.bivar is None:
+                self._build(slot)
+            slot.orders = slot.bivar.refresh_tick()
+            slot.bivar.main_step(slot.orders, slot.balance_ratio_condition, slot.second_total_orders_threshold,
+                                 restart=restart)
+            slot.errors = 0
+        except (Exception, SystemExit) as e:
+            slot.errors += 1
+            slot.skip = min(2 ** slot.errors, self.max_backoff)
+            slot.last_error = ''.join(traceback.format_exception_only(type(e), e)).strip()
+            self.client.print_warning_message('%s: %s, retry in %s steps', slot.name, slot.last_error, slot.skip,
+                                              symbol=slot.name)
+
+    def run_once(self, restart=False):
+        futures = [self.pool.submit(self._step, slot, restart) for slot in self.slots]
+        for future in futures:
+            future.result()
+
+    def run(self, interval=1.0, restart_time='03:00:00'):
+        self.scheduler.every(interval, self.run_once)
+        self.scheduler.daily(restart_time, lambda: self.run_once(restart=True))
+        self.scheduler.every(3600, lambda: self.client.print_info_message(
+            'Connections: %s, limiter: %s, reaction latency: %s, failing: %s', self.transport.stats,
+            self.limiter.stats, self.scheduler.latency, [slot.name for slot in self.slots if slot.errors]))
+        self.run_once()
+        try:
+            self.scheduler.run()
+        finally:
+            for slot in self.slots:
+                if slot.bivar is not None:
+                    slot.bivar.close()
+
+
+if __name__ == '__main__':
+    # python cex_runner.py api_key secret_key
+    api_key, secret_key = sys.argv[1], sys.argv[2]
+    configs = [
+        {'symbol_name': 'GRIN', 'shares': {'GRIN': 7, 'USDT': 3}, 'first_step': 0.005, 'second_step': 0.01},
+        {'symbol_name': 'BTC', 'shares': {'BTC': 5, 'USDT': 5}, 'first_step': 0.005, 'second_step': 0.005},
+    ]
+    Multi_Runner(api_key, secret_key, configs, broker_snapshot='broker_info.json').run()
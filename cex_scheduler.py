@@ -0,0 +1,140 @@
+import sys
+import time
+import heapq
+import queue
+import itertools
+import traceback
+from datetime import datetime, timedelta
+from collections import defaultdict
+
+
+class Latency_Stats(object):
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.count, self.total, self.last, self.max = 0, 0.0, 0.0, 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        self.max = max(self.max, seconds)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def __repr__(self):
+        return f'count: {self.count}, mean: {self.mean * 1e3:.3f}ms, last: {self.last * 1e3:.3f}ms, ' \
+               f'max: {self.max * 1e3:.3f}ms'
+
+
+class Event_Scheduler(object):
+
+    def __init__(self, clock=time.time, on_error=None) -> None:
+        super().__init__()
+
+        self.clock = clock
+        # on_error(name, exception) for a failed handler or timer, the loop itself keeps running
+        self.on_error = on_error
+        self.events = queue.Queue()  # (name, payload, posted at), safe to post from any thread
+        self.handlers = defaultdict(list)
+        self.timers = list()  # heap of (due, seq, interval, func), interval None for one-shot jobs
+        self.seq = itertools.count()
+        self.running = False
+        # time from an event being posted (or a timer being due) to its handler starting
+        self.latency = Latency_Stats()
+
+    def on(self, name, func):
+        self.handlers[name].append(func)
+
+    def post(self, name, payload=None):
+        self.events.put((name, payload, self.clock()))
+
+    def _push(self, due, interval, func):
+        heapq.heappush(self.timers, (due, next(self.seq), interval, func))
+
+    def every(self, interval, func):
+        self._push(self.clock() + interval, interval, func)
+
+    def once(self, delay, func):
+        self._push(self.clock() + delay, None, func)
+
+    def daily(self, hhmmss, func):
+        """
+        Run func every day at a local wall time such as '03:00:00'
+        """
+        now = datetime.fromtimestamp(self.clock())
+        at = datetime.strptime(hhmmss, '%H:%M:%S').time()
+        due = datetime.combine(now.date(), at)
+        if due <= now:
+            due += timedelta(days=1)
+        self._push(due.timestamp(), 24 * 3600, func)
+
+    def _drain(self, timeout):
+        # coalesce a burst of events: each name runs once with its latest payload and earliest post time
+        try:
+            batch = [self.events.get(timeout=timeout) if timeout > 0 else self.events.get_nowait()]
+        except queue.Empty:
+            return dict()
+        while not self.events.empty():
+            batch.append(self.events.get_nowait())
+        pending = dict()
+        for name, payload, posted in batch:
+            pending[name] = (payload, min(posted, pending.get(name, (None, posted))[1]))
+        return pending
+
+    def _call(self, name, func, *args):
+        # one failing handler, e.g. retries exhausted during an exchange outage, must not stop the loop
+        try:
+            func(*args)
+        except Exception as e:
+            if self.on_error is None:
+                traceback.print_exc(file=sys.stderr)
+            else:
+                self.on_error(name, e)
+
+    def run_once(self, max_wait=1.0):
+        timeout = max_wait if not self.timers else min(max_wait, max(0.0, self.timers[0][0] - self.clock()))
+        for name, (payload, posted) in self._drain(timeout).items():
+            self.latency.add(self.clock() - posted)
+            for func in self.handlers[name]:
+                self._call(name, func, payload)
+
+        now = self.clock()
+        while self.timers and self.timers[0][0] <= now:
+            due, _, interval, func = heapq.heappop(self.timers)
+            if interval is not None:
+                self._push(max(due + interval, now), interval, func)
+            self.latency.add(self.clock() - due)
+            self._call(getattr(func, '__name__', 'timer'), func)
+
+    def run(self):
+        self.running = True
+        while self.running:
+            self.run_once()
+
+    def stop(self):
+        self.running = False
+
+
+class Book_Move_Trigger(object):
+
+    def __init__(self, scheduler, threshold, name='book') -> None:
+        super().__init__()
+
+        self.scheduler = scheduler
+        # relative move of the mid price that fires the event
+        self.threshold = threshold
+        self.name = name
+        self.reference = None
+
+    def reset(self, price):
+        self.reference = price
+
+    def update(self, price):
+        if self.reference is None:
+            self.reference = price
+        elif abs(price / self.reference - 1) >= self.threshold:
+            self.reference = price
+            self.scheduler.post(self.name, price)
@@ -0,0 +1,138 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Market_Data_Cache(object):
+
+    def __init__(self, model, ttl=0.5) -> None:
+        super().__init__()
+
+        # every symbol's last price from one ticker/price call, shared by many snapshots
+        self.model = model
+        self.ttl = ttl
+        self.prices = dict()
+        self.updated = -float('inf')
+        self.lock = threading.Lock()
+
+    def _refresh(self):
+        info = self.model._hbtc_get_func(self.model.urls['price'])
+        if isinstance(info, list):
+            self.prices = {item['symbol']: float(item['price']) for item in info}
+            self.updated = self.model.clock()
+
+    def price(self, symbol):
+        with self.lock:
+            if self.model.clock() - self.updated >= self.ttl:
+                self._refresh()
+        return self.prices.get(symbol.upper(), -1)
+
+
+class Market_Snapshot(object):
+
+    def __init__(self, model, symbol, prefetch=('price',), market_cache=None) -> None:
+        super().__init__()
+
+        # only the price is needed every tick, bookTicker and depth are fetched on first use
+        self.model = model
+        self.symbol = symbol.upper()
+        self.prefetch = tuple(prefetch)
+        self.market_cache = market_cache
+        concurrent = len(self.prefetch) > 1 and self.model.transport.concurrent
+        self.pool = ThreadPoolExecutor(max_workers=len(self.prefetch)) if concurrent else None
+
+        self.fetchers = {
+            'price': lambda: self._price(self.symbol),
+            'bookTicker': lambda: self.model._hbtc_get_func(self.model.urls['bookTicker'],
+                                                            params={'symbol': self.symbol}),
+            'depth': lambda: self.model._hbtc_get_func(self.model.urls['depth'], params={'symbol': self.symbol}),
+        }
+        self.data = dict()
+        self.updated = 0.0
+        self.keys = self.prefetch  # fetched by the current tick
+        # optional Market_Data_Recorder fed with every depth fetched
+        self.recorder = None
+        # optional streamed Order_Book, REST depth is not prefetched while it is synced
+        self.order_book = None
+
+    def refresh(self):
+        """
+        Start a new tick: drop the old view and fetch the prefetch set in one concurrent batch
+        """
+        self.data = dict()
+        self.updated = self.model.clock()
+        keys = self.prefetch
+        if self.order_book is not None and self.order_book.synced:
+            keys = tuple(key for key in keys if key != 'depth')
+        self.keys = keys
+        if self.pool is None:
+            for key in keys:
+                self._store(key, self.fetchers[key]())
+        else:
+            futures = {key: self.pool.submit(self.fetchers[key]) for key in keys}
+            for key, future in futures.items():
+                self._store(key, future.result())
+        return self
+
+    def prime(self, data):
+        """
+        Start a new tick from values fetched elsewhere, e.g. by the startup bootstrap
+        :param data: prefetch key -> response
+        """
+        self.data = dict()
+        self.updated = self.model.clock()
+        for key, value in data.items():
+            self._store(key, value)
+        return self
+
+    def _price(self, symbol):
+        if self.market_cache is not None:
+            return self.market_cache.price(symbol)
+        return self.model._get_price(symbol)
+
+    def _store(self, key, value):
+        self.data[key] = value
+        if self.recorder is None:
+            return
+        try:
+            if key == 'depth' and 'bids' in value:
+                self.recorder.record_depth(value)
+            elif key == 'bookTicker' and 'bidPrice' in value and 'depth' not in self.keys + tuple(self.data):
+                # top of book only while this tick has no depth to record instead
+                self.recorder.record_ticker(int(value.get('time', self.model.clock() * 1000)), value)
+        except Exception as e:
+            # recording is best effort and must never fail the order path
+            self.model.print_warning_message('Market data recorder failed and is detached: %r', e)
+            self.recorder = None
+
+    def _get(self, key):
+        if key not in self.data:
+            self._store(key, self.fetchers[key]())
+        return self.data[key]
+
+    @property
+    def price(self):
+        return self._get('price')
+
+    @property
+    def book_ticker(self):
+        return self._get('bookTicker')
+
+    @property
+    def depth(self):
+        return self._get('depth')
+
+    def price_usdt(self, asset_name):
+        asset_name = asset_name.upper()
+        if asset_name == 'USDT':
+            return 1.0
+        if f'{asset_name}USDT' == self.symbol:
+            return self.price
+        return self._price(f'{asset_name}USDT')
+
+    def book_price_usdt(self, asset_name):
+        asset_name = asset_name.upper()
+        if asset_name == 'USDT':
+            return {'bidPrice': 1.0, 'askPrice': 1.0}
+        if f'{asset_name}USDT' == self.symbol:
+            return self.book_ticker
+        return self.model._hbtc_get_func(self.model.urls['bookTicker'], params={'symbol': f'{asset_name}USDT'})
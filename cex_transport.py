@@ -0,0 +1,62 @@
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from cex_ratelimit import Rate_Limited
+
+
+class HBTC_Transport(object):
+    # wall clock, a simulated exchange brings its own virtual one
+    clock = staticmethod(time.time)
+    sleep = staticmethod(time.sleep)
+    concurrent = True
+    simulated = False
+
+    def __init__(self, pool_size=10, timeouts=None, default_timeout=(3.05, 10), limiter=None) -> None:
+        super().__init__()
+
+        # one keep-alive session shared by every request of a model
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                                   max_retries=0, pool_block=False)
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+
+        # (connect, read) timeout in seconds, keyed by url
+        self.timeouts = dict() if timeouts is None else timeouts
+        self.default_timeout = default_timeout
+        # optional Request_Scheduler shared by everything using this transport
+        self.limiter = limiter
+
+    def request(self, method, url, headers={}, params={}):
+        timeout = self.timeouts.get(url, self.default_timeout)
+        if self.limiter is None:
+            return self.session.request(method, url, headers=headers, params=params, timeout=timeout)
+
+        name = self.limiter.acquire(method, url)
+        response = self.session.request(method, url, headers=headers, params=params, timeout=timeout)
+        self.limiter.feedback(name, response.status_code, response.headers)
+        if response.status_code in (418, 429):
+            # raised so the retry decorators back off instead of parsing an error page
+            raise Rate_Limited(f'{response.status_code} {method} {url}')
+        return response
+
+    def _pools(self):
+        pools = self.adapter.poolmanager.pools
+        return [pools[key] for key in pools.keys()]
+
+    @property
+    def connections_opened(self):
+        return sum([pool.num_connections for pool in self._pools()])
+
+    @property
+    def connections_reused(self):
+        return sum([pool.num_requests - pool.num_connections for pool in self._pools()])
+
+    @property
+    def stats(self):
+        return {'opened': self.connections_opened, 'reused': self.connections_reused}
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,87 @@
+import io
+
+import pytest
+
+from cex_backtest import Sim_Exchange
+from cex_bivar import Bivar
+from cex_logging import Async_Logger
+
+SHARES = {'GRIN': 7, 'USDT': 3}
+
+
+def new_bivar(exchange, journal_path):
+    return Bivar(api_key='test', secret_key='test', shares=dict(SHARES), second_step=0.01, second_order_depth=3,
+                 transport=exchange, logger=Async_Logger(stream=io.StringIO(), level='ERROR'),
+                 journal_path=journal_path)
+
+
+def account(exchange):
+    return {item['assetName']: item for item in exchange._account({})['balances']}
+
+
+def assert_ledger_matches(bivar, exchange):
+    balances = account(exchange)
+    for position, asset in ((bivar.portfolio.base, 'GRIN'), (bivar.portfolio.quote, 'USDT')):
+        assert position.total == pytest.approx(float(balances[asset]['total']))
+        assert position.free == pytest.approx(float(balances[asset]['free']))
+
+
+@pytest.fixture
+def exchange():
+    exchange = Sim_Exchange('GRIN', {'GRIN': 10000, 'USDT': 430})
+    exchange.on_tick(1_700_000_000.0, 0.0999, 0.1001)
+    return exchange
+
+
+def test_second_resume_warm_restart(exchange, tmp_path):
+    journal_path = str(tmp_path / 'state.db')
+    bivar = new_bivar(exchange, journal_path)
+    assert not bivar.resumed
+    bivar.second_fresh_idx_list(bivar.second_get_now_order_idxes())
+    ladder = (bivar.second_base_price, list(bivar.second_idx_list))
+    assert len(exchange.orders) == 6
+    bivar.close()
+
+    # while the strategy is down the market trades through the lowest sell and a stray order appears
+    lowest_sell = min(float(order['price']) for order in exchange.orders.values() if order['side'] == 'SELL')
+    exchange.on_tick(exchange.time + 60.0, lowest_sell + 0.0001, lowest_sell + 0.0002)
+    exchange.on_tick(exchange.time + 1.0, 0.0999, 0.1001)
+    assert len(exchange.orders) == 5
+    stray = exchange._new_order({'side': 'BUY', 'price': '0.05', 'quantity': '10'})['orderId']
+    calls = sum(exchange.calls.values())
+
+    bivar = new_bivar(exchange, journal_path)
+    assert bivar.resumed
+    assert (bivar.second_base_price, bivar.second_idx_list) == ladder
+    # nothing was cancelled or placed again apart from the stray
+    assert exchange.calls['DELETE v1/order'] == 1 and stray not in exchange.orders
+    assert exchange.calls['POST v1/order'] == 6
+    assert sorted(order['orderId'] for order in bivar.open_orders.values()) == sorted(exchange.orders)
+    # the fill made while down is in the loaded balances, not credited a second time
+    assert_ledger_matches(bivar, exchange)
+    filled = bivar.second_get_now_order_idxes()
+    assert filled == [1]
+
+    bivar.second_fresh_idx_list(filled)
+    assert bivar.second_idx_list == [4, 3, 2, 0, -1, -2]
+    assert sorted(order['orderId'] for order in bivar.open_orders.values()) == sorted(exchange.orders)
+    assert_ledger_matches(bivar, exchange)
+    assert sum(exchange.calls.values()) > calls
+    bivar.close()
+
+
+def test_orders_learned_from_open_orders_are_journaled(exchange, tmp_path):
+    bivar = new_bivar(exchange, str(tmp_path / 'state.db'))
+    bivar.second_fresh_idx_list(bivar.second_get_now_order_idxes())
+    # e.g. an order placed by an earlier session that crashed before journaling it
+    exchange._new_order({'side': 'BUY', 'price': '0.05', 'quantity': '10'})
+    bivar.sync_open_orders(force=True)
+    assert sorted(order['orderId'] for order in bivar.journal.load_orders()) == sorted(exchange.orders)
+    bivar.close()
+
+
+def test_fresh_start_without_journal(exchange):
+    bivar = new_bivar(exchange, None)
+    assert not bivar.resumed and bivar.second_idx_list == [3, 2, 1, -1, -2, -3]
+    assert bivar.second_base_price == pytest.approx(0.1)
+    bivar.close()
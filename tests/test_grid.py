@@ -0,0 +1,45 @@
+import pytest
+
+from cex_grid import Grid_Ladder
+
+SYMBOL_INFO = {'pricePrecision': 4, 'quantityPrecision': 2, 'tickSize': 0.0001, 'stepSize': 0.01}
+
+
+def new_price(bp, j, step):
+    # the per-level formulas Grid_Ladder replaced
+    return round(bp * pow(1 + step, j), SYMBOL_INFO['pricePrecision'])
+
+
+def delta_qty(bq, step, ratio_ab, j):
+    return round(abs(pow(1 + step, j) - 1) * bq / (1 + ratio_ab), SYMBOL_INFO['quantityPrecision'])
+
+
+def old_window(standard_index, depth):
+    order_idxes = list(range(standard_index + depth, standard_index, -1))
+    return order_idxes + list(range(standard_index - 1, standard_index - depth - 1, -1))
+
+
+@pytest.mark.parametrize('step, ratio_ab', [(0.01, 7 / 3), (0.005, 1.0), (0.03, 0.25)])
+def test_info_matches_formulas(step, ratio_ab):
+    ladder = Grid_Ladder(0.1234, 10000.0, step, ratio_ab, SYMBOL_INFO, band=20)
+    idx_list = old_window(3, 5)
+    center = sum(idx_list) / len(idx_list)
+    sides, prices, quantities = ladder.info(idx_list, center)
+    assert sides == ['SELL' if j > center else 'BUY' for j in idx_list]
+    assert prices == [new_price(0.1234, j, step) for j in idx_list]
+    assert quantities == pytest.approx([delta_qty(10000.0, step, ratio_ab, j) for j in idx_list])
+    assert [ladder.price_tick(j) for j in idx_list] == [round(price / 0.0001) for price in prices]
+
+
+@pytest.mark.parametrize('standard_index', [0, 7, -4])
+@pytest.mark.parametrize('depth', [1, 5])
+def test_window_matches_formula(standard_index, depth):
+    ladder = Grid_Ladder(1.0, 100.0, 0.01, 1.0, SYMBOL_INFO, band=10)
+    assert ladder.window(standard_index, depth) == old_window(standard_index, depth)
+
+
+def test_band_grows_on_demand():
+    ladder = Grid_Ladder(1.0, 100.0, 0.01, 1.0, SYMBOL_INFO, band=4)
+    assert ladder.window(10, 3) == old_window(10, 3)
+    assert ladder.band >= 13
+    assert ladder.price(-30) == new_price(1.0, -30, 0.01)
@@ -0,0 +1,21 @@
+from cex_journal import State_Journal
+
+
+def test_ladder_and_orders_round_trip(tmp_path):
+    path = str(tmp_path / 'state.db')
+    journal = State_Journal(path, 'grinusdt')
+    assert journal.load_ladder() is None
+    journal.save_ladder(0.1, 1000.0, [2, 1, -1, -2], 4)
+    journal.record(added=[{'orderId': 11, 'side': 'SELL', 'price': '0.101', 'origQty': '10'},
+                          {'orderId': 12, 'side': 'BUY', 'price': '0.099', 'origQty': '10'}])
+    journal.record(removed=[11])
+    journal.close()
+
+    journal = State_Journal(path, 'GRINUSDT')
+    assert journal.load_ladder() == {'base_price': 0.1, 'base_qty': 1000.0, 'idx_list': [2, 1, -1, -2],
+                                     'total_orders': 4}
+    assert journal.load_orders() == [{'orderId': '12', 'symbol': 'GRINUSDT', 'side': 'BUY', 'price': '0.099',
+                                      'origQty': '10'}]
+    # every symbol keeps its own ladder
+    assert State_Journal(path, 'BTCUSDT').load_ladder() is None
+    journal.close()
@@ -0,0 +1,70 @@
+import json
+
+from cex_orderbook import Order_Book, Replay_Feed, Depth_Stream
+
+
+def write_feed(path, messages):
+    with open(path, 'w') as f:
+        for message in messages:
+            f.write(json.dumps(message) + '\n')
+    return Replay_Feed(str(path))
+
+
+def test_replay_snapshot_diff_gap_resync(tmp_path):
+    feed = write_feed(tmp_path / 'feed.jsonl', [
+        {'type': 'snapshot', 'seq': 1, 'bids': [[1.0, 5], [0.9, 3]], 'asks': [[1.1, 2], [1.2, 4]]},
+        {'type': 'diff', 'seq': 2, 'bids': [[1.0, 0], [1.05, 1]], 'asks': []},
+        {'type': 'trade', 'time': 1, 'price': 1.05, 'qty': 1, 'side': 'SELL'},
+        # seq 3 is lost, the gap triggers a REST resync
+        {'type': 'diff', 'seq': 4, 'bids': [[0.5, 1]], 'asks': []},
+        {'type': 'trade', 'time': 2, 'price': 1.2, 'qty': 1, 'side': 'BUY'},
+        {'type': 'diff', 'seq': 11, 'bids': [], 'asks': [[1.15, 7]]},
+        {'type': 'trade', 'time': 3, 'price': 1.15, 'qty': 1, 'side': 'BUY'},
+    ])
+    book = Order_Book('grinusdt')
+    snapshots, seen = list(), list()
+
+    def snapshot_func():
+        snapshots.append(book.seq)
+        return {'seq': 10, 'bids': [[0.95, 1]], 'asks': [[1.2, 1]]}
+
+    def on_trade(message):
+        seen.append((book.synced, book.best_bid, book.best_ask))
+
+    stream = Depth_Stream(book, feed, snapshot_func=snapshot_func, on_trade=on_trade)
+    stream.run()
+
+    assert seen[0] == (True, (1.05, 1.0), (1.1, 2.0))
+    assert snapshots == [2]
+    assert book.gaps == 1
+    assert seen[1] == (True, (0.95, 1.0), (1.2, 1.0))
+    assert seen[2] == (True, (0.95, 1.0), (1.15, 7.0))
+    assert stream.messages == 7
+    # a finished feed never leaves a frozen mirror marked synced
+    assert not book.synced
+
+
+def test_failed_resync_keeps_book_invalid(tmp_path):
+    feed = write_feed(tmp_path / 'feed.jsonl', [
+        {'type': 'snapshot', 'seq': 1, 'bids': [[1.0, 5]], 'asks': [[1.1, 2]]},
+        {'type': 'diff', 'seq': 3, 'bids': [], 'asks': []},
+        {'type': 'trade', 'time': 1, 'price': 1.0, 'qty': 1, 'side': 'SELL'},
+    ])
+    book, seen = Order_Book('grinusdt'), list()
+
+    def snapshot_func():
+        raise IOError('depth unavailable')
+
+    stream = Depth_Stream(book, feed, snapshot_func=snapshot_func, on_trade=lambda message: seen.append(book.synced))
+    stream.run()
+    assert seen == [False]
+
+
+def test_one_sided_book_is_not_synced():
+    book = Order_Book('grinusdt')
+    book.apply_snapshot([[1.0, 5]], [], seq=1)
+    assert not book.synced
+    book.apply_snapshot([[1.0, 5]], [[1.1, 1]], seq=1)
+    assert book.synced and book.mid == 1.05
+    assert not book.apply_diff([], [[1.1, 0]], seq=2)
+    assert not book.synced and book.best_ask is None
@@ -0,0 +1,40 @@
+from cex_orders import Open_Order_Tracker
+
+
+def order(order_id, price, quantity='10', executed='0', side='SELL'):
+    return {'orderId': order_id, 'price': price, 'origQty': quantity, 'executedQty': executed, 'side': side}
+
+
+def test_tracker_keys_by_tick():
+    tracker = Open_Order_Tracker(0.0001)
+    tracker.add(order('1', '0.1001'))
+    tracker.add(order('2', '0.1001'))
+    assert tracker.has(tracker.tick('0.1001')) and len(tracker) == 2
+    assert tracker.remove('1')['orderId'] == '1'
+    assert [item['orderId'] for item in tracker.at(1001)] == ['2']
+    tracker.remove('2')
+    assert not tracker.has(1001) and tracker.remove('2') is None
+
+
+def test_reconcile_fills_partials_and_adds():
+    fills, partials, added = list(), list(), list()
+    tracker = Open_Order_Tracker(0.0001, on_fill=fills.append,
+                                 on_partial_fill=lambda item, quantity: partials.append((item['orderId'], quantity)),
+                                 on_add=added.append)
+    tracker.add(order('1', '0.1001'))
+    tracker.add(order('2', '0.1002'))
+    filled = tracker.reconcile([order('2', '0.1002', executed='4'), order('3', '0.1003', executed='1')])
+    assert [item['orderId'] for item in filled] == ['1'] and fills == filled
+    assert partials == [('2', 4.0)] and [item['orderId'] for item in added] == ['3']
+    assert sorted(item['orderId'] for item in tracker.values()) == ['2', '3']
+    # only the growth since the last reconcile is reported
+    tracker.reconcile([order('2', '0.1002', executed='6'), order('3', '0.1003', executed='1')])
+    assert partials == [('2', 4.0), ('2', 2.0)]
+    assert tracker.executed(tracker.orders['2']) == 6.0
+
+
+def test_reconcile_ignores_error_replies():
+    tracker = Open_Order_Tracker(0.0001)
+    tracker.add(order('1', '0.1001'))
+    assert tracker.reconcile({'code': -1001, 'msg': 'Internal error.'}) == list()
+    assert len(tracker) == 1
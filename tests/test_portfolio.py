@@ -0,0 +1,46 @@
+import pytest
+
+from cex_portfolio import Portfolio_Ledger
+
+
+def balances(grin, usdt, grin_locked=0.0, usdt_locked=0.0):
+    return [{'assetName': 'GRIN', 'total': str(grin + grin_locked), 'free': str(grin), 'locked': str(grin_locked)},
+            {'assetName': 'USDT', 'total': str(usdt + usdt_locked), 'free': str(usdt), 'locked': str(usdt_locked)}]
+
+
+def test_lock_fill_unlock():
+    ledger = Portfolio_Ledger('GRIN', fee_rate=0.001)
+    ledger.reconcile(balances(1000.0, 100.0))
+    ledger.lock('BUY', '0.1', '100')
+    assert (ledger.quote.free, ledger.quote.locked) == pytest.approx((90.0, 10.0))
+    # 40 filled, the rest cancelled
+    ledger.fill('BUY', '0.1', '40')
+    ledger.unlock('BUY', '0.1', '60')
+    assert ledger.quote.total == pytest.approx(96.0) and ledger.quote.locked == pytest.approx(0.0)
+    assert ledger.base.total == pytest.approx(1000.0 + 40 * 0.999)
+    ledger.lock('SELL', '0.2', '50')
+    ledger.fill('SELL', '0.2', '50')
+    assert ledger.base.locked == pytest.approx(0.0)
+    assert ledger.quote.total == pytest.approx(96.0 + 10.0 * 0.999)
+    assert not ledger.dirty
+
+
+def test_reconcile_drift_marks_dirty():
+    now = [0.0]
+    ledger = Portfolio_Ledger('GRIN', reconcile_interval=60.0, clock=lambda: now[0])
+    assert ledger.due
+    assert ledger.reconcile(balances(1000.0, 100.0)) == 0.0
+    assert not ledger.due
+    now[0] = 61.0
+    assert ledger.due
+    drift = ledger.reconcile(balances(1000.0, 90.0))
+    assert drift == pytest.approx(10.0 / 90.0) and ledger.dirty and ledger.due
+
+
+def test_mark_and_ratio():
+    ledger = Portfolio_Ledger('GRIN')
+    ledger.reconcile(balances(1000.0, 100.0, usdt_locked=20.0))
+    ledger.mark('0.2')
+    assert ledger.ratio == pytest.approx(200.0 / 120.0)
+    assert ledger.total_assets == pytest.approx(320.0)
+    assert ledger.free_assets == pytest.approx(300.0) and ledger.locked_assets == pytest.approx(20.0)
@@ -0,0 +1,38 @@
+import pytest
+
+from cex_ratelimit import Token_Bucket, Request_Scheduler
+
+
+def test_bucket_refill_and_wait():
+    bucket = Token_Bucket(10.0, 20)
+    bucket.tokens, bucket.updated = 0.0, 100.0
+    bucket.refill(100.5)
+    assert bucket.tokens == pytest.approx(5.0)
+    assert bucket.ready(100.5, 5) and not bucket.ready(100.5, 6)
+    assert bucket.wait_time(100.5, 8) == pytest.approx(0.3)
+    bucket.refill(200.0)
+    assert bucket.tokens == 20
+
+
+def test_throttle_and_recover():
+    bucket = Token_Bucket(10.0, 20)
+    bucket.throttle(0.0, 2.0, 0.5)
+    assert bucket.rate == 5.0 and bucket.tokens == 0.0
+    assert not bucket.ready(1.0, 0) and bucket.wait_time(1.0, 0) == pytest.approx(1.0)
+    for _ in range(100):
+        bucket.recover()
+    assert bucket.rate == 10.0
+
+
+def test_classify_and_feedback():
+    scheduler = Request_Scheduler()
+    assert scheduler.classify('DELETE', 'https://api.hbtc.com/openapi/v1/order') == ('order', 1, 0)
+    assert scheduler.classify('GET', 'https://api.hbtc.com/openapi/v1/account') == ('query', 5, 2)
+    assert scheduler.classify('GET', 'https://api.hbtc.com/openapi/v1/unknown') == ('query', 1, 2)
+    assert scheduler.acquire('GET', 'https://api.hbtc.com/openapi/quote/v1/depth') == 'market'
+
+    scheduler.feedback('market', 429, {'Retry-After': '0'})
+    assert scheduler.throttled == 1 and scheduler.stats['rates']['market'] == 10.0
+    scheduler.feedback('order', 418, {'Retry-After': '0'})
+    assert scheduler.banned == 1
+    assert all(rate < limit for rate, limit in zip(scheduler.stats['rates'].values(), (10.0, 10.0, 10.0, 40.0)))